@@ -0,0 +1,46 @@
+from collections import Counter
+from contextlib import contextmanager
+from executor import CompileQueueFullError
+from threading import Lock
+
+class AdmissionController:
+    def __init__(self, budget, max_per_client, cheap_cost, reserved_budget):
+        self.budget = budget
+        self.max_per_client = max_per_client
+        self.cheap_cost = cheap_cost
+        self.reserved_budget = min(reserved_budget, budget)
+        self.used = 0
+        self.clients = Counter()
+        self.lock = Lock()
+
+    @contextmanager
+    def admit(self, client, cost):
+        cost = self.clamp_cost(cost)
+        with self.lock:
+            self.check(client, cost)
+            self.used += cost
+            self.clients[client] += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.used -= cost
+                self.clients[client] -= 1
+                if not self.clients[client]:
+                    del self.clients[client]
+
+    def clamp_cost(self, cost):
+        if cost <= self.cheap_cost:
+            return min(cost, self.budget)
+        else:
+            return min(cost, self.budget - self.reserved_budget)
+
+    def check(self, client, cost):
+        if client is not None and self.clients[client] >= self.max_per_client:
+            raise CompileQueueFullError(f'Too many compile requests from {client}')
+        available = self.budget - self.used
+        if cost > self.cheap_cost:
+            available -= self.reserved_budget
+        if cost > available:
+            raise CompileQueueFullError('Compile service is at capacity')
+
@@ -0,0 +1,122 @@
+from collections import namedtuple
+from create_test_image import create_test_image, generate_codepoints, parse_glyph_size, save_image
+from compiler import build_with_fontmake
+from input import calculate_info_height, read_image_basics, read_info, read_info_json, read_glyphs
+from io import BytesIO
+from objects import BitFont
+from transforms import convert_to_font
+import click
+import itertools
+import json
+import sys
+import time
+
+BenchmarkCase = namedtuple(
+    'BenchmarkCase',
+    [
+        'image_format',
+        'glyph_size',
+        'glyph_count',
+        'density',
+    ])
+
+def get_case_name(case):
+    (width, height) = case.glyph_size
+    return f'{case.image_format}-{width}x{height}-{case.glyph_count}-{case.density}'
+
+@click.command()
+@click.option('--glyph-size', 'glyph_sizes', multiple=True, default=['8x8', '16x16', '16x32'], help='Glyph size to test, as WIDTHxHEIGHT (repeatable).')
+@click.option('--glyph-count', 'glyph_counts', multiple=True, default=[16, 256], type=click.IntRange(1), help='Glyph count to test (repeatable).')
+@click.option('--density', 'densities', multiple=True, default=[0.3], type=click.FloatRange(0, 1), help='Fill density to test (repeatable).')
+@click.option('--format', 'image_formats', multiple=True, default=['gif', 'png'], type=click.Choice(['gif', 'png', 'bmp']), help='Image format to test (repeatable).')
+@click.option('--build/--no-build', default=True, help='Also time the fontmake build stages.')
+@click.option('--repeat', default=3, type=click.IntRange(1), help='Runs per stage; the fastest is kept.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='File to write the JSON results into.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='JSON results to compare against.')
+@click.option('--threshold', default=1.25, help='Slowdown ratio over the baseline that counts as a regression.')
+def benchmark(glyph_sizes, glyph_counts, densities, image_formats, build, repeat, output, baseline, threshold):
+    """Time each bitfontmake pipeline stage on synthetic fonts."""
+    cases = list(
+        BenchmarkCase(image_format, parse_glyph_size(glyph_size), glyph_count, density)
+        for image_format, glyph_size, glyph_count, density
+        in itertools.product(image_formats, glyph_sizes, glyph_counts, densities))
+    results = {}
+    for case in cases:
+        stages = run_case(case, build, repeat)
+        results[get_case_name(case)] = stages
+        click.echo(format_stages(get_case_name(case), stages))
+    if output:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    if baseline:
+        with open(baseline) as baseline_file:
+            regressions = list(compare_results(json.load(baseline_file), results, threshold))
+        for regression in regressions:
+            click.echo(f'Regression: {regression}', err=True)
+        if regressions:
+            sys.exit(1)
+
+def run_case(case, build, repeat):
+    image_file = BytesIO()
+    save_image(
+        create_test_image(
+            family_name='Bit Font Make Benchmark',
+            glyph_size=case.glyph_size,
+            glyph_codepoints=list(generate_codepoints(case.glyph_count - 1)),
+            density=case.density,
+            image_format=case.image_format),
+        image_file,
+        case.image_format)
+    def open_image():
+        return BytesIO(image_file.getvalue())
+    stages = {}
+    image_basics = time_stage(stages, 'read_image_basics', repeat, read_image_basics, open_image)
+    time_stage(stages, 'read_info_json', repeat, lambda _: read_info_json(image_basics.values, get_info_height(image_basics)))
+    info = read_info(image_basics)
+    glyphs = time_stage(stages, 'read_glyphs', repeat, lambda _: list(read_glyphs(image_basics)))
+    bit_font = BitFont(
+        size=image_basics.glyph_size,
+        info=info,
+        glyphs=glyphs)
+    time_stage(stages, 'convert_to_font', repeat, lambda _: convert_to_font(bit_font))
+    if build:
+        for extension in ['ttf', 'otf']:
+            time_stage(
+                stages,
+                f'build_{extension}s',
+                repeat,
+                lambda font: build_with_fontmake(font, extension),
+                lambda: convert_to_font(bit_font))
+    return stages
+
+def get_info_height(image_basics):
+    (_, image_height) = image_basics.size
+    (_, glyph_height) = image_basics.glyph_size
+    glyph_rows = image_basics.glyph_count // image_basics.glyph_columns
+    return calculate_info_height(image_height, glyph_height, glyph_rows)
+
+def time_stage(stages, stage, repeat, action, prepare=lambda: None):
+    timings = []
+    for _ in range(0, repeat):
+        argument = prepare()
+        begin = time.perf_counter()
+        result = action(argument)
+        timings.append(time.perf_counter() - begin)
+    stages[stage] = min(timings)
+    return result
+
+def format_stages(case_name, stages):
+    timings = ', '.join(
+        f'{stage} {seconds * 1000:.1f}ms'
+        for stage, seconds in stages.items())
+    return f'{case_name}: {timings}'
+
+def compare_results(baseline, results, threshold):
+    for case_name, stages in sorted(results.items()):
+        for stage, seconds in stages.items():
+            baseline_seconds = baseline.get(case_name, {}).get(stage)
+            if baseline_seconds and seconds > baseline_seconds * threshold:
+                yield f'{case_name} {stage} took {seconds * 1000:.1f}ms (baseline {baseline_seconds * 1000:.1f}ms)'
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import os
+import pickle
+
+def create_cache_key(data, *options):
+    digest = hashlib.sha256(data)
+    for option in options:
+        digest.update(b'\0')
+        digest.update(str(option).encode('utf-8'))
+    return digest.hexdigest()
+
+class CompileCache:
+    def __init__(self, max_bytes, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = Lock()
+        self.stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'disk_evictions': 0,
+        }
+        self.disk_size = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.prune_disk()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self.entries[key]
+        value = self.read_from_disk(key)
+        with self.lock:
+            if value is None:
+                self.stats['misses'] += 1
+            else:
+                self.stats['disk_hits'] += 1
+                self.insert(key, value)
+        return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.insert(key, value)
+        self.write_to_disk(key, value)
+
+    def insert(self, key, value):
+        if key in self.entries:
+            self.size -= get_value_size(self.entries.pop(key))
+        value_size = get_value_size(value)
+        if value_size > self.max_bytes:
+            return
+        self.entries[key] = value
+        self.size += value_size
+        while self.size > self.max_bytes:
+            (_, evicted) = self.entries.popitem(last=False)
+            self.size -= get_value_size(evicted)
+            self.stats['evictions'] += 1
+
+    def get_path(self, key):
+        return os.path.join(self.directory, f'{key}.pickle')
+
+    def read_from_disk(self, key):
+        if not self.directory:
+            return None
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                value = pickle.load(cache_file)
+        except OSError:
+            return None
+        except Exception:
+            remove_file(path)
+            return None
+        touch_file(path)
+        return value
+
+    def write_to_disk(self, key, value):
+        if not self.directory:
+            return
+        path = self.get_path(key)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as cache_file:
+            pickle.dump(value, cache_file)
+        os.replace(temporary_path, path)
+        with self.lock:
+            self.disk_size += os.path.getsize(path)
+            if self.disk_size > self.max_bytes:
+                self.prune_disk()
+
+    def prune_disk(self):
+        cache_files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pickle'):
+                try:
+                    entry_stat = entry.stat()
+                except OSError:
+                    continue
+                cache_files.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+        cache_files.sort()
+        disk_size = sum(file_size for _, file_size, _ in cache_files)
+        for _, file_size, path in cache_files:
+            if disk_size <= self.max_bytes:
+                break
+            remove_file(path)
+            disk_size -= file_size
+            self.stats['disk_evictions'] += 1
+        self.disk_size = disk_size
+
+    def get_stats(self):
+        with self.lock:
+            return dict(
+                self.stats,
+                entries=len(self.entries),
+                bytes=self.size,
+                disk_bytes=self.disk_size,
+                max_bytes=self.max_bytes)
+
+def touch_file(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def get_value_size(value):
+    return len(value.data)
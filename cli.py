@@ -0,0 +1,149 @@
+from multiprocessing import Pool
+from compiler import compilers, compiler_version, default_compiler, compile_source, compile_source_incrementally, font_formats
+from output import BitmapStrikes
+import click
+import hashlib
+import json
+import os
+
+input_extensions = ['.bmp', '.gif', '.png', '.bdf', '.pcf', '.bitfont']
+
+manifest_filename = '.bitfontmake-manifest.json'
+
+state_directory = '.bitfontmake-state'
+
+@click.group(name='bitfontmake')
+def cli():
+    """Compile raster images to vectorized bitmap fonts."""
+
+@cli.command()
+@click.argument('inputs', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--output-dir', '-o', default='.', type=click.Path(file_okay=False), help='Directory to write fonts into.')
+@click.option('--format', '-f', 'formats', multiple=True, default=['ttf'], type=click.Choice(sorted(font_formats)), help='Font format to build (repeatable).')
+@click.option('--compiler', default=default_compiler, type=click.Choice(sorted(compilers)), help='Compiler backend.')
+@click.option('--jobs', '-j', default=os.cpu_count(), type=click.IntRange(1), help='Number of fonts to compile in parallel.')
+@click.option('--force', is_flag=True, help='Rebuild inputs even if they are unchanged.')
+@click.option('--incremental', is_flag=True, help='Only re-outline glyphs changed since the last build (uses the direct compiler).')
+@click.option('--strike', 'strikes', multiple=True, type=click.IntRange(1), help='Add an embedded bitmap strike at this multiple of the native size (repeatable).')
+@click.option('--bitmap-only', is_flag=True, help='Leave out outlines, keeping only bitmap strikes (TrueType formats only).')
+def build(inputs, output_dir, formats, compiler, jobs, force, incremental, strikes, bitmap_only):
+    """Compile raster images and bitmap font files (or directories of them) to fonts."""
+    if incremental:
+        compiler = 'direct'
+    bitmap_strikes = BitmapStrikes(
+        scales=tuple(sorted(set(strikes or ([1] if bitmap_only else [])))),
+        outlines=not bitmap_only)
+    if bitmap_only and any(font_formats[font_format] != 'ttf' for font_format in formats):
+        raise click.BadParameter('bitmap-only fonts need a TrueType format (ttf, woff or woff2)', param_hint='--bitmap-only')
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, manifest_filename)
+    manifest = read_manifest(manifest_path)
+    options = f'{",".join(formats)};{compiler};{bitmap_strikes};{compiler_version}'
+    input_paths = list(find_input_files(inputs))
+    output_paths = dict(
+        (filename, path)
+        for path, entry in manifest.items()
+        if path in input_paths
+        for filename in entry['outputs'])
+    pending = []
+    for path in input_paths:
+        input_hash = hash_file(path)
+        entry = manifest.get(path)
+        if not force and is_up_to_date(entry, input_hash, options, output_dir):
+            click.echo(f'Unchanged {path}')
+        else:
+            state_path = get_state_path(output_dir, path) if incremental else None
+            pending.append((path, input_hash, state_path))
+    failures = 0
+    with Pool(min(jobs, max(len(pending), 1))) as pool:
+        results = pool.imap_unordered(
+            build_file,
+            ((path, input_hash, formats, compiler, bitmap_strikes, state_path) for path, input_hash, state_path in pending))
+        for path, input_hash, compiled_fonts, changes, error in results:
+            if not error:
+                error = find_output_collision(output_paths, path, compiled_fonts)
+            if error:
+                failures += 1
+                manifest.pop(path, None)
+                click.echo(f'Failed {path}: {error}', err=True)
+            else:
+                for compiled_font in compiled_fonts:
+                    output_paths[compiled_font.filename] = path
+                    with open(os.path.join(output_dir, compiled_font.filename), 'wb') as font_file:
+                        font_file.write(compiled_font.data)
+                manifest[path] = {
+                    'hash': input_hash,
+                    'options': options,
+                    'outputs': list(compiled_font.filename for compiled_font in compiled_fonts),
+                }
+                click.echo(f'Built {path}{changes}')
+            write_manifest(manifest_path, manifest)
+    if failures:
+        raise click.ClickException(f'{failures} of {len(pending)} fonts failed to build')
+
+def find_input_files(inputs):
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for directory, _, filenames in sorted(os.walk(input_path)):
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1].lower() in input_extensions:
+                        yield os.path.join(directory, filename)
+        else:
+            yield input_path
+
+def find_output_collision(output_paths, path, compiled_fonts):
+    for compiled_font in compiled_fonts:
+        other_path = output_paths.get(compiled_font.filename, path)
+        if other_path != path:
+            return f'{compiled_font.filename} is also built from {other_path}'
+    return None
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as input_file:
+        for chunk in iter(lambda: input_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_up_to_date(entry, input_hash, options, output_dir):
+    return (entry is not None
+        and entry['hash'] == input_hash
+        and entry['options'] == options
+        and all(
+            os.path.exists(os.path.join(output_dir, filename))
+            for filename in entry['outputs']))
+
+def get_state_path(output_dir, path):
+    path_hash = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    (name, _) = os.path.splitext(os.path.basename(path))
+    return os.path.join(output_dir, state_directory, f'{name}-{path_hash}.pickle')
+
+def build_file(job):
+    (path, input_hash, formats, compiler, bitmap_strikes, state_path) = job
+    try:
+        with open(path, 'rb') as input_file:
+            data = input_file.read()
+        if state_path:
+            result = compile_source_incrementally(data, formats, state_path, None, bitmap_strikes)
+            changes = f' ({len(result.changed_glyphs)} glyphs changed, {result.traced_glyphs} outlines traced)'
+            return (path, input_hash, result.compiled_fonts, changes, None)
+        else:
+            return (path, input_hash, compile_source(data, formats, compiler, None, bitmap_strikes), '', None)
+    except Exception as error:
+        return (path, input_hash, None, None, str(error) or type(error).__name__)
+
+def read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+def write_manifest(manifest_path, manifest):
+    temporary_path = f'{manifest_path}.tmp'
+    with open(temporary_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(temporary_path, manifest_path)
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+
+frame_header = struct.Struct('>I')
+
+def get_socket_path():
+    return os.environ.get(
+        'BITFONTMAKE_SOCKET',
+        os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), f'bitfontmake-{os.getuid()}.sock'))
+
+def send_frame(connection, payload):
+    connection.sendall(frame_header.pack(len(payload)) + payload)
+
+def receive_frame(connection):
+    (length,) = frame_header.unpack(receive_exactly(connection, frame_header.size))
+    return receive_exactly(connection, length)
+
+def receive_exactly(connection, length):
+    chunks = []
+    while length:
+        chunk = connection.recv(min(length, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError('Compile daemon closed the connection')
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b''.join(chunks)
+
+class CompileError(Exception):
+    pass
+
+class UntrustedSocketError(Exception):
+    pass
+
+def compile_with_daemon(socket_path, data, formats, compiler):
+    check_socket_owner(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        send_frame(connection, json.dumps({'formats': formats, 'compiler': compiler}).encode('utf-8'))
+        send_frame(connection, data)
+        response = json.loads(receive_frame(connection))
+        if 'error' in response:
+            raise CompileError(response['error'])
+        return list(
+            (check_filename(filename), receive_frame(connection))
+            for filename in response['filenames'])
+
+def check_socket_owner(socket_path):
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise UntrustedSocketError(f'Socket {socket_path} belongs to another user')
+
+def check_filename(filename):
+    if not isinstance(filename, str) or os.path.basename(filename) != filename or filename in ['', '.', '..']:
+        raise CompileError(f'Compile daemon sent an invalid filename {filename!r}')
+    return filename
+
+def compile_in_process(data, formats, compiler):
+    from compiler import compile_source
+    try:
+        return list(
+            (compiled_font.filename, compiled_font.data)
+            for compiled_font in compile_source(data, formats, compiler))
+    except Exception as error:
+        raise CompileError(str(error) or type(error).__name__) from error
+
+def compile_file(path, formats, compiler, socket_path):
+    with open(path, 'rb') as input_file:
+        data = input_file.read()
+    try:
+        return compile_with_daemon(socket_path, data, formats, compiler)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return compile_in_process(data, formats, compiler)
+    except UntrustedSocketError as error:
+        print(f'Not using the compile daemon: {error}', file=sys.stderr)
+        return compile_in_process(data, formats, compiler)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description='Compile a raster image to fonts, through the bitfontmake daemon when it is running.')
+    parser.add_argument('input', help='Raster image to compile.')
+    parser.add_argument('--output-dir', '-o', default='.', help='Directory to write fonts into.')
+    parser.add_argument('--format', '-f', dest='formats', action='append', help='Font format to build (repeatable, default ttf).')
+    parser.add_argument('--compiler', default='fontmake', help='Compiler backend.')
+    parser.add_argument('--socket', default=get_socket_path(), help='Daemon socket path.')
+    options = parser.parse_args(arguments)
+    try:
+        compiled_fonts = compile_file(options.input, options.formats or ['ttf'], options.compiler, options.socket)
+    except CompileError as error:
+        print(f'Failed {options.input}: {error}', file=sys.stderr)
+        return 1
+    os.makedirs(options.output_dir, exist_ok=True)
+    for filename, data in compiled_fonts:
+        with open(os.path.join(options.output_dir, os.path.basename(filename)), 'wb') as font_file:
+            font_file.write(data)
+        print(f'Built {filename}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,3 +11,6 @@ spaces = list(map(unicodedata.lookup, [
 
 def is_uppercase(codepoint):
     return unicodedata.category(codepoint) == 'Lu'
+
+def has_name(codepoint):
+    return unicodedata.name(codepoint, None) is not None
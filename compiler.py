@@ -0,0 +1,190 @@
+from collections import namedtuple
+from io import BytesIO
+from incremental import GlyphStore, load_glyph_store, save_glyph_store, find_changed_glyphs
+from metrics import Timings
+from readers import read_bit_font
+from ufo2ft import compileOTF, compileTTF
+from ufo2ft.fontInfoData import postscriptFontNameFallback
+from utils import distinct
+from transforms import convert_to_font, subset_bit_font
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
+import fontTools
+import hashlib
+import os
+import output
+import ufo2ft
+
+def hash_source_files():
+    source_directory = os.path.dirname(os.path.abspath(__file__))
+    source_hash = hashlib.sha256()
+    for name in sorted(os.listdir(source_directory)):
+        if name.endswith('.py'):
+            source_hash.update(name.encode('utf-8'))
+            with open(os.path.join(source_directory, name), 'rb') as source_file:
+                source_hash.update(source_file.read())
+    return source_hash.hexdigest()[0:16]
+
+compiler_version = ' '.join([
+    f'fonttools/{fontTools.version}',
+    f'ufo2ft/{ufo2ft.__version__}',
+    f'source/{hash_source_files()}',
+])
+
+def compile_source(data, formats, compiler, limits=None, bitmap_strikes=output.no_bitmap_strikes, subset_text=None):
+    return compile_source_timed(data, formats, compiler, limits, bitmap_strikes, subset_text).compiled_fonts
+
+def compile_source_timed(data, formats, compiler, limits=None, bitmap_strikes=output.no_bitmap_strikes, subset_text=None):
+    timings = Timings()
+    with timings.span('open_bit_font'):
+        bit_font = read_bit_font(BytesIO(data), limits)
+    if subset_text is not None:
+        with timings.span('subset'):
+            bit_font = subset_bit_font(bit_font, subset_text)
+    compiled_fonts = compile_formats(bit_font, formats, compiler, timings, bitmap_strikes)
+    return CompileResult(
+        compiled_fonts=compiled_fonts,
+        spans=timings.spans,
+        glyph_count=len(bit_font.glyphs),
+        glyph_size=bit_font.size)
+
+def compile_source_incrementally(data, formats, state_path, limits=None, bitmap_strikes=output.no_bitmap_strikes):
+    bit_font = read_bit_font(BytesIO(data), limits)
+    glyph_store = load_glyph_store(state_path, bit_font.size)
+    changed_glyphs = find_changed_glyphs(glyph_store.bit_font, bit_font)
+    compiled_fonts = compile_formats(bit_font, formats, 'direct', bitmap_strikes=bitmap_strikes, glyph_store=glyph_store)
+    save_glyph_store(state_path, glyph_store, bit_font)
+    return IncrementalResult(
+        compiled_fonts=compiled_fonts,
+        changed_glyphs=changed_glyphs,
+        traced_glyphs=glyph_store.traced)
+
+IncrementalResult = namedtuple(
+    'IncrementalResult',
+    [
+        'compiled_fonts',
+        'changed_glyphs',
+        'traced_glyphs',
+    ])
+
+CompileResult = namedtuple(
+    'CompileResult',
+    [
+        'compiled_fonts',
+        'spans',
+        'glyph_count',
+        'glyph_size',
+    ])
+
+def compile_formats(bit_font, formats, compiler, timings=None, bitmap_strikes=output.no_bitmap_strikes, **options):
+    timings = timings or Timings()
+    extensions = list(distinct(
+        font_formats[font_format]
+        for font_format in formats))
+    compiled_fonts = dict(zip(
+        extensions,
+        compilers[compiler](bit_font, extensions, timings, **options)))
+    if bitmap_strikes != output.no_bitmap_strikes:
+        with timings.span('bitmap_strikes'):
+            compiled_fonts = dict(
+                (extension, add_bitmap_strikes(compiled_font, bit_font, bitmap_strikes))
+                for extension, compiled_font in compiled_fonts.items())
+    with timings.span('convert_flavor'):
+        return list(
+            convert_compiled_font(compiled_fonts[font_formats[font_format]], font_format)
+            for font_format in formats)
+
+font_formats = {
+    'ttf': 'ttf',
+    'otf': 'otf',
+    'woff': 'ttf',
+    'woff2': 'ttf',
+}
+
+CompiledFont = namedtuple(
+    'CompiledFont',
+    [
+        'filename',
+        'data',
+    ])
+
+def add_bitmap_strikes(compiled_font, bit_font, bitmap_strikes):
+    return CompiledFont(
+        filename=compiled_font.filename,
+        data=output.add_bitmap_strikes(compiled_font.data, bit_font, bitmap_strikes))
+
+def convert_compiled_font(compiled_font, font_format):
+    (name, extension) = os.path.splitext(compiled_font.filename)
+    if extension == f'.{font_format}':
+        return compiled_font
+    else:
+        return CompiledFont(
+            filename=f'{name}.{font_format}',
+            data=output.convert_flavor(compiled_font.data, font_format))
+
+def compile_with_fontmake(bit_font, extensions, timings=None):
+    timings = timings or Timings()
+    with timings.span('convert_to_font'):
+        font = convert_to_font(bit_font)
+    with timings.span('build'):
+        return list(
+            build_with_fontmake(font, extension)
+            for extension in extensions)
+
+def build_with_fontmake(font, extension):
+    tt_font = fontmake_actions[extension](font)
+    output.freeze_timestamps(tt_font)
+    font_file = BytesIO()
+    tt_font.save(font_file)
+    return CompiledFont(
+        filename=f'{get_font_name(font)}.{extension}',
+        data=font_file.getvalue())
+
+fontmake_actions = {
+    'otf': lambda font: compileOTF(font, optimizeCFF=False),
+    'ttf': lambda font: compileTTF(font),
+}
+
+def get_font_name(font):
+    return postscriptFontNameFallback(font.info)
+
+def compile_directly(bit_font, extensions, timings=None, glyph_store=None):
+    timings = timings or Timings()
+    glyph_store = glyph_store or GlyphStore(bit_font.size)
+    font_name = output.get_postscript_name(bit_font.info)
+    with timings.span('build'):
+        return list(
+            CompiledFont(
+                filename=f'{font_name}.{extension}',
+                data=output.build_font(bit_font, extension, glyph_store))
+            for extension in extensions)
+
+def compile_streaming(bit_font, extensions, timings=None):
+    timings = timings or Timings()
+    font_name = output.get_postscript_name(bit_font.info)
+    with timings.span('build'):
+        return list(
+            CompiledFont(
+                filename=f'{font_name}.{extension}',
+                data=output.build_font_streaming(bit_font, extension))
+            for extension in extensions)
+
+compilers = {
+    'fontmake': compile_with_fontmake,
+    'direct': compile_directly,
+    'streaming': compile_streaming,
+}
+
+default_compiler = 'fontmake'
+
+def create_archive(compiled_fonts):
+    (name, _) = os.path.splitext(compiled_fonts[0].filename)
+    archive_file = BytesIO()
+    with ZipFile(archive_file, 'w', ZIP_DEFLATED) as archive:
+        for compiled_font in compiled_fonts:
+            archive.writestr(
+                ZipInfo(compiled_font.filename, date_time=(1980, 1, 1, 0, 0, 0)),
+                compiled_font.data,
+                ZIP_DEFLATED)
+    return CompiledFont(
+        filename=f'{name}.zip',
+        data=archive_file.getvalue())
@@ -1,16 +1,43 @@
 from PIL import Image
-from itertools import chain
 import codepoints
 import json
 import click
+import numpy
+import random
 
 @click.command()
 @click.argument('extension')
-@click.argument('glyphs')
-def create(extension, glyphs):
-    """Create a blank, test raster image for input into bitfontmake."""
-    info_bytes = json.dumps({
-        'f': f'Bit Font Make Test{extension.upper()}',
+@click.argument('glyphs', default='')
+@click.option('--glyph-size', default='4x6', help='Glyph width and height, as WIDTHxHEIGHT.')
+@click.option('--glyph-count', default=0, type=click.IntRange(0), help='Number of extra glyphs to generate after GLYPHS.')
+@click.option('--density', default=0.0, type=click.FloatRange(0, 1), help='Fraction of glyph pixels to fill.')
+@click.option('--format', 'image_format', default='png', type=click.Choice(['gif', 'png', 'bmp']), help='Image file format.')
+@click.option('--seed', default=0, help='Random seed for the filled pixels.')
+@click.option('--glyph-columns', default=1, type=click.IntRange(1), help='Number of glyph columns in the grid layout.')
+def create(extension, glyphs, glyph_size, glyph_count, density, image_format, seed, glyph_columns):
+    """Create a test raster image for input into bitfontmake."""
+    glyph_codepoints = list(glyphs) + list(generate_codepoints(glyph_count))
+    image = create_test_image(
+        family_name=f'Bit Font Make Test{extension.upper()}',
+        glyph_size=parse_glyph_size(glyph_size),
+        glyph_codepoints=glyph_codepoints,
+        density=density,
+        image_format=image_format,
+        seed=seed,
+        glyph_columns=glyph_columns)
+    print(image.size, len(glyph_codepoints) + 1)
+    save_image(image, f'test_{extension}.{image_format}', image_format)
+
+def parse_glyph_size(glyph_size):
+    (width, height) = glyph_size.lower().split('x')
+    return (int(width), int(height))
+
+def generate_codepoints(count):
+    return (chr(0x4E00 + i) for i in range(0, count))
+
+def create_test_image(family_name, glyph_size, glyph_codepoints, density=0.0, image_format='png', seed=0, glyph_columns=1):
+    info = {
+        'f': family_name,
         's': 'Regular',
         'w': 400,
         'd': 'Ay Non',
@@ -19,43 +46,73 @@ def create(extension, glyphs):
         'mj': 0,
         'mn': 1,
         'o': True,
-    }, separators=(',', ':')).encode('utf-8')
-    print(info_bytes, len(info_bytes))
+    }
+    if glyph_columns > 1:
+        info['gc'] = glyph_columns
+    info_bytes = json.dumps(info, separators=(',', ':')).encode('utf-8')
 
-    glyph_width, glyph_height = (4, 6)
-    glyph_codepoints = (list(glyphs)
-        + [codepoints.replacement_character])
+    glyph_width, glyph_height = glyph_size
+    glyph_codepoints = list(glyph_codepoints)
+    glyph_rows = (len(glyph_codepoints) + glyph_columns - 1) // glyph_columns + 1
+    tiles = (list(enumerate(glyph_codepoints))
+        + [((glyph_rows - 1) * glyph_columns, codepoints.replacement_character)])
 
-    image_width = glyph_width + 2
+    image_width = (glyph_width + 2) * glyph_columns
     image_info_height = (len(info_bytes) + image_width - 1) // image_width
     image_height = (image_info_height
-        + (glyph_height + 2) * len(glyph_codepoints))
-    print(glyph_width, glyph_height, image_width, image_height)
+        + (glyph_height + 2) * glyph_rows)
+
+    values = numpy.full((image_height, image_width), 255, numpy.uint8)
+    values.ravel()[:len(info_bytes)] = list(info_bytes)
+    fill = random.Random(seed)
+    for i, glyph_codepoint in tiles:
+        glyph_y = image_info_height + (i // glyph_columns) * (glyph_height + 2)
+        glyph_x = (i % glyph_columns) * (glyph_width + 2)
+        codepoint_bytes = list(glyph_codepoint.encode('utf-8'))
+        values[glyph_y : glyph_y + len(codepoint_bytes), glyph_x] = codepoint_bytes
+        for y in range(0, glyph_height):
+            for x in range(0, glyph_width):
+                if fill.random() < density:
+                    values[glyph_y + 1 + y, glyph_x + 1 + x] = 0
 
+    return convert_values_to_image(values, image_format)
+
+def convert_values_to_image(values, image_format):
+    if image_format == 'gif':
+        image = Image.fromarray(values)
+        image.putpalette(get_palette())
+        image.info['transparency'] = 255
+        return image
+    elif image_format == 'bmp':
+        return Image.fromarray(numpy.dstack([
+            values,
+            numpy.where(values == 0, 0, 255).astype(numpy.uint8),
+            numpy.where(values == 0, 0, 255).astype(numpy.uint8),
+        ]))
+    else:
+        return Image.fromarray(numpy.dstack([
+            values,
+            numpy.where(values == 0, 0, 255).astype(numpy.uint8),
+            numpy.where(values == 0, 0, 255).astype(numpy.uint8),
+            numpy.where(values == 255, 0, 255).astype(numpy.uint8),
+        ]))
+
+def get_palette():
     def get_color(byte_value):
         if byte_value == 0:
-            return (0, 0, 0, 255)
-        elif byte_value == 255:
-            return (255, 255, 255, 0)
+            return (0, 0, 0)
         else:
-            return (byte_value, 255, 255, 255)
-
-    image = Image.new(
-        'RGBA',
-        (image_width, image_height),
-        get_color(255))
-    image_data = list(image.getdata())
-    for i, info_byte in enumerate(info_bytes):
-        image_data[i] = get_color(info_byte)
-    for i, glyph_codepoint in enumerate(glyph_codepoints):
-        glyph_y = image_info_height + i * (glyph_height + 2)
-        for j, glyph_codepoint_byte in enumerate(glyph_codepoint.encode('utf-8')):
-            k = (glyph_y + j) * image_width
-            image_data[k] = get_color(glyph_codepoint_byte)
-            print(k, glyph_codepoint_byte)
-
-    image.putdata(image_data)
-    image.save(f'test_{extension}.png')
+            return (byte_value, 255, 255)
+    return list(
+        channel
+        for byte_value in range(0, 256)
+        for channel in get_color(byte_value))
+
+def save_image(image, path, image_format):
+    if image_format == 'gif':
+        image.save(path, format='GIF', transparency=255, optimize=False)
+    else:
+        image.save(path, format=image_format.upper())
 
 if __name__ == '__main__':
     create()
@@ -0,0 +1,92 @@
+from client import get_socket_path, send_frame, receive_frame
+from compiler import compilers, compile_source, font_formats
+from create_test_image import create_test_image, save_image
+from io import BytesIO
+import click
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+
+@click.command()
+@click.option('--socket', 'socket_path', default=get_socket_path(), help='Path of the Unix socket to listen on.')
+def daemon(socket_path):
+    """Keep the font compiler loaded and serve compile requests from client.py."""
+    remove_stale_socket(socket_path)
+    warm_up()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with create_server(socket_path) as server:
+        click.echo(f'Listening on {socket_path}')
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+def create_server(socket_path):
+    original_umask = os.umask(0o177)
+    try:
+        return CompileServer(socket_path, CompileHandler)
+    finally:
+        os.umask(original_umask)
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class CompileHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            options = json.loads(receive_frame(self.request))
+            data = receive_frame(self.request)
+            compiled_fonts = compile_request(data, options)
+        except ConnectionError:
+            return
+        except Exception as error:
+            send_response(self.request, {'error': str(error) or type(error).__name__})
+            return
+        send_response(self.request, {
+            'filenames': list(compiled_font.filename for compiled_font in compiled_fonts),
+        })
+        for compiled_font in compiled_fonts:
+            send_frame(self.request, compiled_font.data)
+
+def compile_request(data, options):
+    formats = options.get('formats', ['ttf'])
+    compiler = options.get('compiler', 'fontmake')
+    for font_format in formats:
+        if font_format not in font_formats:
+            raise ValueError(f'Unknown font format {font_format}')
+    if compiler not in compilers:
+        raise ValueError(f'Unknown compiler {compiler}')
+    return compile_source(data, formats, compiler)
+
+def send_response(connection, response):
+    send_frame(connection, json.dumps(response).encode('utf-8'))
+
+def remove_stale_socket(socket_path):
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+        else:
+            raise click.ClickException(f'A compile daemon is already listening on {socket_path}')
+
+def warm_up():
+    image_file = BytesIO()
+    save_image(
+        create_test_image(
+            family_name='Bit Font Make Warm Up',
+            glyph_size=(4, 6),
+            glyph_codepoints=['A'],
+            density=0.5),
+        image_file,
+        'png')
+    for compiler in compilers:
+        compile_source(image_file.getvalue(), list(font_formats), compiler)
+
+if __name__ == '__main__':
+    daemon()
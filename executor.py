@@ -0,0 +1,82 @@
+from threading import BoundedSemaphore
+import importlib
+import multiprocessing
+import time
+
+class CompileQueueFullError(Exception):
+    pass
+
+class CompileTimeoutError(Exception):
+    pass
+
+class CompileWorkerError(Exception):
+    pass
+
+def warm_up(module_names):
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+def get_process_context(warm_modules):
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(warm_modules)
+        return context
+    else:
+        return multiprocessing.get_context()
+
+class CompileExecutor:
+    def __init__(self, processes, max_queued, timeout, warm_modules=[]):
+        self.processes = processes
+        self.timeout = timeout
+        self.slots = BoundedSemaphore(max(processes, 1) + max_queued)
+        self.workers = BoundedSemaphore(max(processes, 1))
+        self.context = get_process_context(warm_modules)
+        warm_up(warm_modules)
+
+    def run(self, function, *args):
+        if not self.slots.acquire(blocking=False):
+            raise CompileQueueFullError('Too many compile jobs waiting')
+        try:
+            if self.processes:
+                return self.run_in_process(function, args)
+            else:
+                return function(*args)
+        finally:
+            self.slots.release()
+
+    def run_in_process(self, function, args):
+        deadline = time.monotonic() + self.timeout
+        if not self.workers.acquire(timeout=self.timeout):
+            raise self.create_timeout_error()
+        try:
+            (receiver, sender) = self.context.Pipe(duplex=False)
+            process = self.context.Process(target=run_task, args=(sender, function, args), daemon=True)
+            process.start()
+            sender.close()
+            try:
+                if not receiver.poll(max(deadline - time.monotonic(), 0)):
+                    raise self.create_timeout_error()
+                (succeeded, value) = receiver.recv()
+            except EOFError as eof_error:
+                raise CompileWorkerError('Compile worker exited without a result') from eof_error
+            finally:
+                receiver.close()
+                process.terminate()
+                process.join()
+        finally:
+            self.workers.release()
+        if succeeded:
+            return value
+        else:
+            raise value
+
+    def create_timeout_error(self):
+        return CompileTimeoutError(f'Compile job took longer than {self.timeout} seconds')
+
+def run_task(sender, function, args):
+    try:
+        result = (True, function(*args))
+    except Exception as exception:
+        result = (False, exception)
+    sender.send(result)
+    sender.close()
@@ -0,0 +1,69 @@
+from outlines import trace_outlines
+import os
+import pickle
+
+state_version = 1
+
+class GlyphStore:
+    def __init__(self, size, bit_font=None):
+        self.version = state_version
+        self.size = size
+        self.bit_font = bit_font
+        self.outlines = {}
+        self.glyph_data = {}
+        self.used = set()
+        self.traced = 0
+
+    def get_outlines(self, bits):
+        self.used.add(bits)
+        if bits not in self.outlines:
+            self.outlines[bits] = list(trace_outlines(self.size, bits))
+            self.traced += 1
+        return self.outlines[bits]
+
+    def get_glyph_data(self, extension, bits, compile_glyph):
+        key = (extension, bits)
+        self.used.add(bits)
+        if key not in self.glyph_data:
+            self.glyph_data[key] = compile_glyph()
+        return self.glyph_data[key]
+
+    def prune(self):
+        self.outlines = dict(
+            (bits, outlines)
+            for bits, outlines in self.outlines.items()
+            if bits in self.used)
+        self.glyph_data = dict(
+            (key, data)
+            for key, data in self.glyph_data.items()
+            if key[1] in self.used)
+        self.used = set()
+
+def find_changed_glyphs(previous_bit_font, bit_font):
+    previous_bits = dict(
+        (bit_glyph.codepoint, bit_glyph.bits)
+        for bit_glyph in (previous_bit_font.glyphs if previous_bit_font else []))
+    return list(
+        bit_glyph.codepoint
+        for bit_glyph in bit_font.glyphs
+        if previous_bits.get(bit_glyph.codepoint) != bit_glyph.bits)
+
+def load_glyph_store(path, size):
+    try:
+        with open(path, 'rb') as state_file:
+            glyph_store = pickle.load(state_file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return GlyphStore(size)
+    if getattr(glyph_store, 'version', None) != state_version or glyph_store.size != size:
+        return GlyphStore(size, getattr(glyph_store, 'bit_font', None))
+    glyph_store.traced = 0
+    return glyph_store
+
+def save_glyph_store(path, glyph_store, bit_font):
+    glyph_store.prune()
+    glyph_store.bit_font = bit_font
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as state_file:
+        pickle.dump(glyph_store, state_file)
+    os.replace(temporary_path, path)
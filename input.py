@@ -1,15 +1,17 @@
 from PIL import Image
 from collections import defaultdict, namedtuple
+from contextlib import contextmanager
 from functools import partial
 from jsonschema import Draft4Validator
-from objects import BitFont, BitInfo, BitGlyph
-from utils import count_while
-import codepoints
+from objects import BitFont, BitInfo, BitGlyph, PackedBits
+from utils import count_leading
 import json
+import numpy
+import os
 
-def open_bit_font(source):
+def open_bit_font(source, limits=None):
     try:
-        image_basics = read_image_basics(source)
+        image_basics = read_image_basics(source, limits)
         info = read_info(image_basics)
         glyphs = list(read_glyphs(image_basics))
         return BitFont(
@@ -24,6 +26,20 @@ def open_bit_font(source):
 class ImageInputError(Exception):
     pass
 
+class ImageLimitError(ImageInputError):
+    pass
+
+ImageLimits = namedtuple(
+    'ImageLimits',
+    [
+        'max_upload_bytes',
+        'max_pixels',
+    ])
+
+default_image_limits = ImageLimits(
+    max_upload_bytes=8 * 1024 * 1024,
+    max_pixels=16 * 1024 * 1024)
+
 ImageInputBasics = namedtuple(
     'ImageInputBasics',
     [
@@ -31,60 +47,169 @@ ImageInputBasics = namedtuple(
         'values',
         'glyph_size',
         'glyph_count',
+        'glyph_columns',
+        'info_json',
     ])
 
-def read_image_basics(path):
-    image = convert_image_to_rgba(Image.open(path))
+def read_image_basics(path, limits=None):
+    image = open_image(path, limits or default_image_limits)
     image_values = get_image_values(image)
-    image_left_column = get_image_left_column(image_values, image.width)
-    image_left_column_reversed = list(reversed(image_left_column))
-    glyph_width = calculate_glyph_width(image.width)
+    (image_width, image_height) = image.size
+    image_left_column = get_image_left_column(image_values)
+    image_left_column_reversed = image_left_column[::-1]
     glyph_height = find_glyph_height(image_left_column_reversed)
-    glyph_count = count_glyphs(image_left_column_reversed, glyph_height)
+    glyph_rows = count_glyph_rows(image_left_column_reversed, glyph_height)
+    info_height = calculate_info_height(image_height, glyph_height, glyph_rows)
+    info_json = read_info_json(image_values, info_height)
+    glyph_columns = info_json.get('gc', 1)
+    glyph_width = calculate_glyph_width(image_width, glyph_columns)
     return ImageInputBasics(
         size=image.size,
         values=image_values,
         glyph_size=(glyph_width, glyph_height),
-        glyph_count=glyph_count)
+        glyph_count=glyph_rows * glyph_columns,
+        glyph_columns=glyph_columns,
+        info_json=info_json)
+
+def estimate_compile_cost(source, limits=None):
+    image = open_image(source, limits or default_image_limits)
+    return calculate_compile_cost(image.size, 1)
+
+def calculate_compile_cost(glyph_size, glyph_count):
+    (glyph_width, glyph_height) = glyph_size
+    return max(glyph_width * glyph_height * glyph_count, 1)
+
+def admit_image(source, limits=None):
+    open_image(source, limits or default_image_limits)
 
-def convert_image_to_rgba(image):
-    if image.mode == 'RGBA':
-        return image
+def open_image(source, limits):
+    check_upload_size(source, limits)
+    try:
+        image = Image.open(source)
+    except decompression_bomb_error as bomb_error:
+        raise ImageLimitError(f'Image size over the limit of {Image.MAX_IMAGE_PIXELS} pixels') from bomb_error
+    except (IOError, SyntaxError) as image_error:
+        raise ImageInputError('Unrecognized image format') from image_error
+    check_image_header(image, limits)
+    return image
+
+decompression_bomb_error = getattr(Image, 'DecompressionBombError', ())
+
+def check_upload_size(source, limits):
+    if isinstance(source, str):
+        check_upload_bytes(os.path.getsize(source), limits)
+    elif hasattr(source, 'getbuffer'):
+        check_upload_bytes(source.getbuffer().nbytes, limits)
+
+def check_upload_bytes(upload_bytes, limits):
+    if upload_bytes > limits.max_upload_bytes:
+        raise ImageLimitError(f'Upload size {upload_bytes} bytes over the limit of {limits.max_upload_bytes} bytes')
+
+def check_glyph_pixels(glyph_size, glyph_count, limits):
+    (glyph_width, glyph_height) = glyph_size
+    pixels = glyph_width * glyph_height * glyph_count
+    if pixels > limits.max_pixels:
+        raise ImageLimitError(f'{glyph_count} glyphs of {glyph_width}x{glyph_height} over the limit of {limits.max_pixels} pixels')
+
+def check_glyph_size(glyph_size):
+    (glyph_width, glyph_height) = glyph_size
+    if glyph_width < 3:
+        raise ImageInputError(f'Glyph width {glyph_width} too low')
+    if glyph_height < 3:
+        raise ImageInputError(f'Glyph height {glyph_height} too low')
+
+@contextmanager
+def open_source(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as source_file:
+            yield source_file
     else:
-        return image.convert(mode='RGBA')
+        yield source
+
+def check_image_header(image, limits):
+    (image_width, image_height) = image.size
+    calculate_glyph_width(image_width)
+    pixels = image_width * image_height
+    if pixels > limits.max_pixels:
+        raise ImageLimitError(f'Image size {image_width}x{image_height} over the limit of {limits.max_pixels} pixels')
 
 def get_image_values(image):
-    def convert(color):
-        red = color[0]
-        alpha = color[3]
-        if red < 0 or red > 255:
-            raise ImageInputError(f'Red value {value} not in range')
-        elif red != int(red):
-            raise ImageInputError(f'Red value {value} not an integer')
-        elif alpha == 0:
-            return 255
-        else:
-            return int(red)
-    return list(map(convert, image.getdata()))
-
-def get_image_left_column(image_values, image_width):
-    indices = range(
-        0,
-        len(image_values),
-        image_width)
-    return list(image_values[i] for i in indices)
-
-def calculate_glyph_width(image_width):
-    width = image_width - 2
+    if image.mode == 'P' and image.palette.mode == 'RGB':
+        return get_lookup_values(image, create_palette_lookup(image))
+    elif image.mode == 'L':
+        return get_lookup_values(image, create_gray_lookup(image))
+    elif image.mode in alpha_channels:
+        return get_channel_values(image, alpha_channels[image.mode])
+    else:
+        return get_channel_values(image.convert(mode='RGBA'), 3)
+
+alpha_channels = {
+    'RGBA': 3,
+    'LA': 1,
+    'RGB': None,
+}
+
+def get_lookup_values(image, lookup):
+    return lookup[numpy.asarray(image)]
+
+def create_palette_lookup(image):
+    colors = numpy.array(image.getpalette()[:256 * 3], numpy.uint8).reshape(-1, 3)
+    lookup = numpy.zeros(256, numpy.uint8)
+    lookup[:len(colors)] = colors[:, 0]
+    apply_lookup_transparency(lookup, image.info.get('transparency'))
+    return lookup
+
+def create_gray_lookup(image):
+    lookup = numpy.arange(256, dtype=numpy.uint8)
+    apply_lookup_transparency(lookup, image.info.get('transparency'))
+    return lookup
+
+def apply_lookup_transparency(lookup, transparency):
+    if isinstance(transparency, int):
+        lookup[transparency] = 255
+    elif isinstance(transparency, bytes):
+        alpha = numpy.frombuffer(transparency[:256], numpy.uint8)
+        lookup[:len(alpha)][alpha == 0] = 255
+
+def get_channel_values(image, alpha_channel):
+    pixels = numpy.asarray(image)
+    red = pixels[:, :, 0]
+    validate_red_values(red)
+    values = numpy.array(red, numpy.uint8)
+    if alpha_channel is not None:
+        values[pixels[:, :, alpha_channel] == 0] = 255
+    elif isinstance(image.info.get('transparency'), tuple):
+        values[(pixels == image.info['transparency']).all(axis=2)] = 255
+    return values
+
+def validate_red_values(red):
+    if red.dtype == numpy.uint8:
+        return
+    out_of_range = (red < 0) | (red > 255)
+    if out_of_range.any():
+        value = red[out_of_range][0]
+        raise ImageInputError(f'Red value {value} not in range')
+    not_integer = red != numpy.floor(red)
+    if not_integer.any():
+        value = red[not_integer][0]
+        raise ImageInputError(f'Red value {value} not an integer')
+
+def get_image_left_column(image_values):
+    return image_values[:, 0]
+
+def calculate_glyph_width(image_width, glyph_columns=1):
+    if image_width % glyph_columns:
+        raise ImageInputError(f'Image width {image_width} not divisible into {glyph_columns} glyph columns')
+    width = image_width // glyph_columns - 2
     if width < 3:
         raise ImageInputError(f'Glyph width {width} too low')
     return width
 
 def find_glyph_height(image_left_column_reversed):
-    blanks = count_while(is_pixel_blank, image_left_column_reversed)
+    blanks = count_leading(is_pixel_blank(image_left_column_reversed))
     last_begin = blanks + 0
     last_end = blanks + 3
-    last_codepoint = image_left_column_reversed[last_begin : last_end]
+    last_codepoint = image_left_column_reversed[last_begin : last_end].tolist()
     if last_codepoint != [0xBD, 0xBF, 0xEF]:
         raise ImageInputError(f'Could not find U+FFFD glyph ({last_codepoint} found instead)')
     height = blanks + 1
@@ -96,43 +221,37 @@ def is_pixel_blank(value):
     return value == 0xFF
 
 def is_pixel_nonblank(value):
-    return not is_pixel_blank(value)
+    return value != 0xFF
 
-def count_glyphs(image_left_column_reversed, glyph_height):
-    indices = range(
-        glyph_height + 2,
-        len(image_left_column_reversed),
-        glyph_height + 2)
-    pixels = (image_left_column_reversed[i] for i in indices)
-    return count_while(is_pixel_blank, pixels) + 1
+def count_glyph_rows(image_left_column_reversed, glyph_height):
+    pixels = image_left_column_reversed[glyph_height + 2 :: glyph_height + 2]
+    return count_leading(is_pixel_blank(pixels)) + 1
 
 def read_info(image_basics):
-    image_values = image_basics.values
-    (image_width, image_height) = image_basics.size
-    (glyph_width, glyph_height) = image_basics.glyph_size
-    glyph_count = image_basics.glyph_count
-    info_height = calculate_info_height(image_height, glyph_height, glyph_count)
-    info_values = get_info_values(image_values, image_width, info_height)
+    return create_bit_info(image_basics.info_json)
+
+def calculate_info_height(image_height, glyph_height, glyph_rows):
+    return image_height - (glyph_height + 2) * glyph_rows
+
+def read_info_json(image_values, info_height):
+    info_values = get_info_values(image_values, info_height)
     info_string = extract_and_decode_utf8(info_values)
     info_json = decode_json(info_string)
     validate_info_json(info_json)
-    return create_bit_info(info_json)
+    return info_json
 
-def calculate_info_height(image_height, glyph_height, glyph_count):
-    return image_height - (glyph_height + 2) * glyph_count
-
-def get_info_values(image_data, image_width, image_info_height):
-    return image_data[0 : image_width * image_info_height]
+def get_info_values(image_data, image_info_height):
+    return image_data[0 : image_info_height].ravel()
 
 def extract_and_decode_utf8(values):
     return decode_utf8(extract_utf8(values))
 
 def extract_utf8(values):
-    utf8_count = count_while(is_pixel_nonblank, values)
+    utf8_count = count_leading(is_pixel_nonblank(values))
     blanks = values[utf8_count:]
-    if blanks and not all(map(is_pixel_blank, blanks)):
-        raise ImageInputError(f'Non-blank data after UTF-8 data (found {blanks})')
-    return bytes(values[:utf8_count])
+    if not is_pixel_blank(blanks).all():
+        raise ImageInputError(f'Non-blank data after UTF-8 data (found {blanks.tolist()})')
+    return values[:utf8_count].tobytes()
 
 def decode_utf8(utf8):
     try:
@@ -174,6 +293,7 @@ def validate_info_json(info_json):
           'mj': non_negative_integer,
           'mn': non_negative_integer,
           'o': boolean,
+          'gc': positive_integer,
       },
       'required': [
           'f',
@@ -208,22 +328,39 @@ def create_bit_info(info_json):
         minor_version=info_json['mn'],
         is_ofl=info_json['o'])
 
-def read_glyphs(image_basics):
-    for i in range(0, image_basics.glyph_count):
-        glyph_values = get_glyph_values(
-            image_basics.values,
-            image_basics.size,
-            image_basics.glyph_size,
-            image_basics.glyph_count - 1 - i)
-        yield read_glyph(image_basics.glyph_size, glyph_values)
-
-def get_glyph_values(image_data, image_size, glyph_size, i):
+def read_glyphs(image_basics, map_function=map):
+    return map_function(
+        partial(read_glyph, image_basics.glyph_size),
+        get_glyph_tiles(image_basics))
+
+def get_glyph_tiles(image_basics):
+    columns = image_basics.glyph_columns
+    rows = image_basics.glyph_count // columns
+    for row in range(0, rows):
+        for column in range(0, columns):
+            glyph_values = get_glyph_values(
+                image_basics.values,
+                image_basics.size,
+                image_basics.glyph_size,
+                rows - 1 - row,
+                column)
+            if columns == 1 or not is_tile_empty(glyph_values):
+                if row == rows - 1 and column > 0:
+                    raise ImageInputError('Glyph found after the U+FFFD glyph')
+                yield glyph_values
+
+def get_glyph_values(image_data, image_size, glyph_size, i, column=0):
     (image_width, image_height) = image_size
+    padded_glyph_width = glyph_size[0] + 2
     padded_glyph_height = glyph_size[1] + 2
-    start_row = image_height - (i + 1) * padded_glyph_height
-    begin = start_row * image_width
-    end = begin + padded_glyph_height * image_width
-    return image_data[begin : end]
+    begin = image_height - (i + 1) * padded_glyph_height
+    end = begin + padded_glyph_height
+    left = column * padded_glyph_width
+    right = left + padded_glyph_width
+    return image_data[begin : end, left : right]
+
+def is_tile_empty(glyph_values):
+    return is_pixel_blank(glyph_values).all()
 
 def read_glyph(glyph_size, glyph_values):
     codepoint = read_glyph_codepoint(glyph_size, glyph_values)
@@ -241,43 +378,37 @@ def read_glyph_codepoint(glyph_size, glyph_values):
     return codepoint_string
 
 def get_glyph_column_values(glyph_size, glyph_values, i):
-    indices = range(
-        i,
-        (glyph_size[0] + 2) * (glyph_size[1] + 2),
-        glyph_size[0] + 2)
-    return list(glyph_values[j] for j in indices)
+    return glyph_values[:, i]
 
 def validate_glyph_border(glyph_size, glyph_values):
     top = 0
     right = glyph_size[0] + 1
     bottom = glyph_size[1] + 1
-    border = (get_glyph_row_values(glyph_size, glyph_values, top)
-        + get_glyph_column_values(glyph_size, glyph_values, right)
-        + get_glyph_row_values(glyph_size, glyph_values, bottom))
-    if not all(map(is_pixel_blank, border)):
-        raise ImageInputError(f'Glyph border not all blank (found {border})')
+    border = [
+        get_glyph_row_values(glyph_size, glyph_values, top),
+        get_glyph_column_values(glyph_size, glyph_values, right),
+        get_glyph_row_values(glyph_size, glyph_values, bottom),
+    ]
+    if not all(is_pixel_blank(values).all() for values in border):
+        found = list(value for values in border for value in values.tolist())
+        raise ImageInputError(f'Glyph border not all blank (found {found})')
 
 def get_glyph_row_values(glyph_size, glyph_values, i):
-    begin = i * (glyph_size[0] + 2) + 1
-    end = begin + glyph_size[0]
-    return glyph_values[begin : end]
+    return glyph_values[i, 1 : glyph_size[0] + 1]
 
 def read_glyph_bits(glyph_size, glyph_values):
     bit_values = get_glyph_bit_values(glyph_size, glyph_values)
-    validate_glyph_bit_values(bit_values)
-    return list(map(is_pixel_filled, bit_values))
+    filled = is_pixel_filled(bit_values)
+    validate_glyph_bit_values(bit_values, filled)
+    packed = numpy.packbits(filled, bitorder='little')
+    return PackedBits.from_bytes(packed.tobytes(), bit_values.size)
 
 def get_glyph_bit_values(glyph_size, glyph_values):
-    rows = map(
-        partial(get_glyph_row_values, glyph_size, glyph_values),
-        range(1, glyph_size[1] + 1))
-    return sum(rows, [])
-
-def validate_glyph_bit_values(glyph_bit_values):
-    def test(value):
-        return is_pixel_filled(value) or is_pixel_blank(value)
-    if not all(map(test, glyph_bit_values)):
-        raise ImageInputError(f'Glyph bit data out of range (found {glyph_bit_values})')
+    return glyph_values[1 : glyph_size[1] + 1, 1 : glyph_size[0] + 1]
+
+def validate_glyph_bit_values(glyph_bit_values, filled):
+    if not (filled | is_pixel_blank(glyph_bit_values)).all():
+        raise ImageInputError(f'Glyph bit data out of range (found {glyph_bit_values.ravel().tolist()})')
 
 def is_pixel_filled(value):
     return value == 0
@@ -0,0 +1,237 @@
+from input import ImageInputError, check_glyph_pixels, check_glyph_size, create_bit_info, validate_info_json
+from objects import BitFont, BitGlyph, PackedBits
+import codecs
+import codepoints
+import numpy
+import re
+
+def read_bdf_font(source_file, limits):
+    lines = read_bdf_lines(source_file)
+    (font_name, cell_box, properties, glyph_count) = read_bdf_header(lines)
+    glyph_size = cell_box[0:2]
+    check_glyph_size(glyph_size)
+    check_glyph_pixels(glyph_size, glyph_count, limits)
+    decode_codepoint = get_codepoint_decoder(properties)
+    glyphs = list(read_bdf_glyphs(lines, cell_box, glyph_count, decode_codepoint))
+    default_glyph = find_default_glyph(glyphs, decode_codepoint, properties.get('DEFAULT_CHAR'))
+    return BitFont(
+        size=glyph_size,
+        info=create_properties_info(properties, font_name),
+        glyphs=glyphs + default_glyph)
+
+def count_bdf_glyphs(source_file):
+    (_, cell_box, _, glyph_count) = read_bdf_header(read_bdf_lines(source_file))
+    return (cell_box[0:2], glyph_count)
+
+def read_bdf_lines(source_file):
+    for line in source_file:
+        line = line.decode('utf-8', errors='replace').strip()
+        if line and not line.startswith('COMMENT'):
+            yield line
+
+def read_bdf_header(lines):
+    first_line = next(lines, '')
+    if not first_line.startswith('STARTFONT'):
+        raise ImageInputError(f'BDF file starts with "{first_line}" instead of STARTFONT')
+    font_name = ''
+    cell_box = None
+    properties = {}
+    for line in lines:
+        (keyword, _, value) = line.partition(' ')
+        if keyword == 'FONT':
+            font_name = value
+        elif keyword == 'FONTBOUNDINGBOX':
+            cell_box = parse_integers(value, 4)
+        elif keyword == 'STARTPROPERTIES':
+            properties = read_bdf_properties(lines)
+        elif keyword == 'CHARS':
+            if cell_box is None:
+                raise ImageInputError('BDF file has no FONTBOUNDINGBOX')
+            (glyph_count,) = parse_integers(value, 1)
+            return (font_name, cell_box, properties, glyph_count)
+    raise ImageInputError('BDF file has no CHARS')
+
+def read_bdf_properties(lines):
+    properties = {}
+    for line in lines:
+        if line == 'ENDPROPERTIES':
+            return properties
+        (name, _, value) = line.partition(' ')
+        properties[name] = parse_property_value(value.strip())
+    raise ImageInputError('BDF file has no ENDPROPERTIES')
+
+def parse_property_value(value):
+    if value.startswith('"'):
+        return value[1:-1].replace('""', '"')
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+def parse_integers(value, count):
+    try:
+        integers = tuple(map(int, value.split()))
+    except ValueError as value_error:
+        raise ImageInputError(f'BDF value "{value}" not made of integers') from value_error
+    if len(integers) < count:
+        raise ImageInputError(f'BDF value "{value}" has fewer than {count} integers')
+    return integers[0:count]
+
+def read_bdf_glyphs(lines, cell_box, glyph_count, decode_codepoint):
+    read_count = 0
+    for line in lines:
+        if line == 'ENDFONT':
+            return
+        elif line.startswith('STARTCHAR'):
+            read_count += 1
+            if read_count > glyph_count:
+                raise ImageInputError(f'BDF file has more glyphs than its CHARS count of {glyph_count}')
+            (encoding, bits) = read_bdf_glyph(lines, cell_box)
+            codepoint = decode_codepoint(encoding)
+            if codepoint is not None:
+                yield BitGlyph(codepoint=codepoint, bits=bits)
+    raise ImageInputError('BDF file has no ENDFONT')
+
+def read_bdf_glyph(lines, cell_box):
+    encoding = -1
+    glyph_box = (0, 0, 0, 0)
+    for line in lines:
+        (keyword, _, value) = line.partition(' ')
+        if keyword == 'ENCODING':
+            (encoding,) = parse_integers(value, 1)
+        elif keyword == 'BBX':
+            glyph_box = parse_integers(value, 4)
+        elif keyword == 'BITMAP':
+            rows = read_bdf_bitmap(lines, glyph_box[1])
+            return (encoding, create_cell_bits(cell_box, glyph_box, parse_bdf_pixels(glyph_box, rows)))
+    raise ImageInputError('BDF glyph has no BITMAP')
+
+def read_bdf_bitmap(lines, height):
+    rows = []
+    for line in lines:
+        if line == 'ENDCHAR':
+            if len(rows) != height:
+                raise ImageInputError(f'BDF glyph has {len(rows)} bitmap rows instead of {height}')
+            return rows
+        rows.append(line)
+    raise ImageInputError('BDF glyph has no ENDCHAR')
+
+def parse_bdf_pixels(glyph_box, rows):
+    (width, height, _, _) = glyph_box
+    if width <= 0 or height <= 0:
+        return numpy.zeros((0, 0), bool)
+    row_bytes = (width + 7) // 8
+    try:
+        data = bytes.fromhex(''.join(row[0 : row_bytes * 2] for row in rows))
+    except ValueError as value_error:
+        raise ImageInputError(f'BDF bitmap rows not hexadecimal (found {rows})') from value_error
+    if len(data) != row_bytes * height:
+        raise ImageInputError(f'BDF bitmap rows too short (found {rows})')
+    pixels = numpy.unpackbits(numpy.frombuffer(data, numpy.uint8).reshape(height, row_bytes), axis=1)
+    return pixels[:, 0 : width].astype(bool)
+
+def create_cell_bits(cell_box, glyph_box, pixels):
+    (cell_width, cell_height, cell_x, cell_y) = cell_box
+    (_, _, x, y) = glyph_box
+    (height, width) = pixels.shape
+    cell = numpy.zeros((cell_height, cell_width), bool)
+    top = (cell_y + cell_height) - (y + height)
+    left = x - cell_x
+    row_begin = max(top, 0)
+    row_end = min(top + height, cell_height)
+    column_begin = max(left, 0)
+    column_end = min(left + width, cell_width)
+    if row_begin < row_end and column_begin < column_end:
+        cell[row_begin : row_end, column_begin : column_end] = pixels[
+            row_begin - top : row_end - top,
+            column_begin - left : column_end - left]
+    return PackedBits.from_bytes(
+        numpy.packbits(cell, bitorder='little').tobytes(),
+        cell.size)
+
+def get_codepoint_decoder(properties):
+    registry = str(properties.get('CHARSET_REGISTRY', 'ISO10646')).upper()
+    encoding = str(properties.get('CHARSET_ENCODING', '1'))
+    if registry in unicode_registries:
+        return decode_unicode
+    try:
+        codec = codecs.lookup(f'{registry}-{encoding}')
+    except LookupError as lookup_error:
+        raise ImageInputError(f'Unsupported charset {registry}-{encoding}') from lookup_error
+    return lambda encoding: decode_single_byte(codec.name, encoding)
+
+unicode_registries = ['ISO10646', 'UNICODE']
+
+def decode_unicode(encoding):
+    if 0 <= encoding <= 0x10FFFF:
+        return chr(encoding)
+    else:
+        return None
+
+def decode_single_byte(codec_name, encoding):
+    if not 0 <= encoding <= 0xFF:
+        return None
+    try:
+        return bytes([encoding]).decode(codec_name)
+    except UnicodeDecodeError:
+        return None
+
+def find_default_glyph(glyphs, decode_codepoint, default_encoding):
+    if any(glyph.codepoint == codepoints.replacement_character for glyph in glyphs):
+        return []
+    default_codepoint = decode_codepoint(default_encoding) if isinstance(default_encoding, int) else None
+    return list(
+        BitGlyph(codepoint=codepoints.replacement_character, bits=glyph.bits)
+        for glyph in glyphs
+        if glyph.codepoint == default_codepoint)[0:1]
+
+def create_properties_info(properties, font_name):
+    info_json = {
+        'f': str(properties.get('FAMILY_NAME') or get_xlfd_family_name(font_name) or 'Untitled'),
+        's': get_style_name(properties),
+        'w': weight_classes.get(get_weight_name(properties), 400),
+    }
+    copyright_year = re.search(r'\b(1[89]|2[0-9])[0-9]{2}\b', str(properties.get('COPYRIGHT', '')))
+    if copyright_year:
+        info_json['c'] = copyright_year.group(0)
+    validate_info_json(info_json)
+    return create_bit_info(info_json)
+
+def get_xlfd_family_name(font_name):
+    fields = font_name.split('-')
+    if font_name.startswith('-') and len(fields) > 2:
+        return fields[2]
+    else:
+        return font_name
+
+def get_weight_name(properties):
+    return re.sub('[^a-z]', '', str(properties.get('WEIGHT_NAME', '')).lower())
+
+def get_style_name(properties):
+    weight_name = get_weight_name(properties)
+    is_italic = str(properties.get('SLANT', 'R')).upper() in ['I', 'O']
+    words = []
+    if weight_classes.get(weight_name, 400) != 400:
+        words.append(weight_name.capitalize())
+    if is_italic:
+        words.append('Italic')
+    return ' '.join(words) or 'Regular'
+
+weight_classes = {
+    'thin': 100,
+    'extralight': 200,
+    'ultralight': 200,
+    'light': 300,
+    'book': 400,
+    'normal': 400,
+    'regular': 400,
+    'medium': 400,
+    'semibold': 600,
+    'demibold': 600,
+    'demi': 600,
+    'bold': 700,
+    'extrabold': 800,
+    'ultrabold': 800,
+    'black': 900,
+    'heavy': 900,
+}
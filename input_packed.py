@@ -0,0 +1,164 @@
+from input import ImageInputError, check_glyph_pixels, check_glyph_size, create_bit_info, decode_json, format_json_validation_error, validate_info_json
+from jsonschema import Draft4Validator
+from objects import BitFont, BitGlyph, PackedBits
+import json
+import struct
+
+packed_magic = b'BFMK'
+packed_version = 1
+packed_header = struct.Struct('>4sBHHI')
+packed_count = struct.Struct('>I')
+packed_codepoint = struct.Struct('>I')
+
+def read_packed_json_font(source_file, limits):
+    packed_json = decode_packed_json(source_file)
+    glyph_size = tuple(packed_json['size'])
+    check_glyph_size(glyph_size)
+    check_glyph_pixels(glyph_size, len(packed_json['glyphs']), limits)
+    validate_info_json(packed_json['info'])
+    return BitFont(
+        size=glyph_size,
+        info=create_bit_info(packed_json['info']),
+        glyphs=list(
+            BitGlyph(codepoint=codepoint, bits=parse_packed_bits(glyph_size, bytes.fromhex(bits)))
+            for codepoint, bits in packed_json['glyphs']))
+
+def decode_packed_json(source_file):
+    try:
+        packed_json = json.loads(source_file.read().decode('utf-8', errors='strict'))
+    except ValueError as value_error:
+        raise ImageInputError(f'Invalid packed font JSON ({value_error})') from value_error
+    validate_packed_json(packed_json)
+    return packed_json
+
+def validate_packed_json(packed_json):
+    positive_integer = {
+        'type': 'integer',
+        'minimum': 1,
+    }
+    schema = {
+        'type': 'object',
+        'properties': {
+            'size': {
+                'type': 'array',
+                'items': positive_integer,
+                'minItems': 2,
+                'maxItems': 2,
+            },
+            'info': {
+                'type': 'object',
+            },
+            'glyphs': {
+                'type': 'array',
+                'items': {
+                    'type': 'array',
+                    'items': [
+                        {'type': 'string', 'minLength': 1, 'maxLength': 1},
+                        {'type': 'string', 'pattern': '^([0-9a-fA-F]{2})*$'},
+                    ],
+                    'minItems': 2,
+                    'maxItems': 2,
+                },
+            },
+        },
+        'required': [
+            'size',
+            'info',
+            'glyphs',
+        ]
+    }
+    errors = list(Draft4Validator(schema).iter_errors(packed_json))
+    if errors:
+        messages = ', '.join(map(format_json_validation_error, errors))
+        raise ImageInputError(f'Invalid packed font JSON ({messages})')
+
+def count_packed_json_glyphs(source_file):
+    packed_json = decode_packed_json(source_file)
+    return (tuple(packed_json['size']), len(packed_json['glyphs']))
+
+def read_packed_binary_font(source_file, limits):
+    (glyph_size, info_json, glyph_count) = read_packed_binary_header(source_file)
+    check_glyph_size(glyph_size)
+    validate_info_json(info_json)
+    check_glyph_pixels(glyph_size, glyph_count, limits)
+    (width, height) = glyph_size
+    bits_length = (width * height + 7) // 8
+    return BitFont(
+        size=glyph_size,
+        info=create_bit_info(info_json),
+        glyphs=list(
+            read_packed_glyph(source_file, glyph_size, bits_length)
+            for _ in range(0, glyph_count)))
+
+def count_packed_binary_glyphs(source_file):
+    (glyph_size, _, glyph_count) = read_packed_binary_header(source_file)
+    return (glyph_size, glyph_count)
+
+def read_packed_binary_header(source_file):
+    (magic, version, width, height, info_length) = packed_header.unpack(
+        read_exactly(source_file, packed_header.size))
+    if magic != packed_magic or version != packed_version:
+        raise ImageInputError(f'Unsupported packed font header (found {magic} version {version})')
+    info_json = decode_json(read_exactly(source_file, info_length).decode('utf-8', errors='strict'))
+    (glyph_count,) = packed_count.unpack(read_exactly(source_file, packed_count.size))
+    return ((width, height), info_json, glyph_count)
+
+def read_packed_glyph(source_file, glyph_size, bits_length):
+    (codepoint,) = packed_codepoint.unpack(read_exactly(source_file, packed_codepoint.size))
+    if codepoint > 0x10FFFF:
+        raise ImageInputError(f'Packed glyph codepoint {codepoint:#x} out of range')
+    return BitGlyph(
+        codepoint=chr(codepoint),
+        bits=parse_packed_bits(glyph_size, read_exactly(source_file, bits_length)))
+
+def read_exactly(source_file, length):
+    data = source_file.read(length)
+    if len(data) != length:
+        raise ImageInputError('Packed font data ends early')
+    return data
+
+def parse_packed_bits(glyph_size, data):
+    (width, height) = glyph_size
+    bits = PackedBits.from_bytes(data, width * height)
+    if len(data) != (width * height + 7) // 8 or bits.value >> bits.length:
+        raise ImageInputError(f'Packed glyph bits {data.hex()} do not fit {width}x{height}')
+    return bits
+
+def get_info_json(bit_info):
+    info_json = {
+        'f': bit_info.family_name,
+        's': bit_info.style_name,
+        'w': bit_info.weight,
+        'd': bit_info.designer,
+        'du': bit_info.designer_url,
+        'c': bit_info.copyright_year,
+        'mj': bit_info.major_version,
+        'mn': bit_info.minor_version,
+        'o': bit_info.is_ofl,
+    }
+    return dict(
+        (key, value)
+        for key, value in info_json.items()
+        if value is not None)
+
+def write_packed_json_font(bit_font):
+    return json.dumps({
+        'size': list(bit_font.size),
+        'info': get_info_json(bit_font.info),
+        'glyphs': list(
+            [bit_glyph.codepoint, bit_glyph.bits.to_bytes().hex()]
+            for bit_glyph in bit_font.glyphs),
+    }, ensure_ascii=False).encode('utf-8')
+
+def write_packed_binary_font(bit_font):
+    (width, height) = bit_font.size
+    info = json.dumps(get_info_json(bit_font.info), ensure_ascii=False).encode('utf-8')
+    return b''.join(
+        [
+            packed_header.pack(packed_magic, packed_version, width, height, len(info)),
+            info,
+            packed_count.pack(len(bit_font.glyphs)),
+        ]
+        + list(
+            packed_codepoint.pack(ord(bit_glyph.codepoint)) + bit_glyph.bits.to_bytes()
+            for bit_glyph in bit_font.glyphs))
@@ -0,0 +1,149 @@
+from input import ImageInputError, check_glyph_pixels, check_glyph_size
+from input_bdf import create_cell_bits, create_properties_info, find_default_glyph, get_codepoint_decoder
+from objects import BitFont, BitGlyph
+import numpy
+import struct
+
+pcf_magic = b'\x01fcp'
+
+pcf_properties = 1 << 0
+pcf_metrics = 1 << 2
+pcf_bitmaps = 1 << 3
+pcf_bdf_encodings = 1 << 5
+
+pcf_compressed_metrics = 0x100
+pcf_byte_mask = 1 << 2
+pcf_bit_mask = 1 << 3
+
+def read_pcf_font(source_file, limits):
+    data = source_file.read()
+    if data[0:4] != pcf_magic:
+        raise ImageInputError('PCF file has no header')
+    tables = read_pcf_table_of_contents(data)
+    properties = read_pcf_properties(data, get_pcf_table(tables, pcf_properties))
+    metrics = read_pcf_metrics(data, get_pcf_table(tables, pcf_metrics))
+    cell_box = calculate_cell_box(metrics)
+    glyph_size = cell_box[0:2]
+    check_glyph_size(glyph_size)
+    check_glyph_pixels(glyph_size, len(metrics), limits)
+    (encodings, default_encoding) = read_pcf_encodings(data, get_pcf_table(tables, pcf_bdf_encodings))
+    decode_codepoint = get_codepoint_decoder(properties)
+    bitmaps = read_pcf_bitmaps(data, get_pcf_table(tables, pcf_bitmaps), metrics)
+    glyphs = list(
+        BitGlyph(
+            codepoint=codepoint,
+            bits=create_cell_bits(cell_box, get_glyph_box(metrics[i]), bitmaps(i)))
+        for encoding, i in encodings
+        for codepoint in [decode_codepoint(encoding)]
+        if codepoint is not None and i < len(metrics))
+    default_glyph = find_default_glyph(glyphs, decode_codepoint, default_encoding)
+    return BitFont(
+        size=glyph_size,
+        info=create_properties_info(properties, str(properties.get('FONT', ''))),
+        glyphs=glyphs + default_glyph)
+
+def count_pcf_glyphs(source_file):
+    data = source_file.read()
+    if data[0:4] != pcf_magic:
+        raise ImageInputError('PCF file has no header')
+    tables = read_pcf_table_of_contents(data)
+    metrics = read_pcf_metrics(data, get_pcf_table(tables, pcf_metrics))
+    return (calculate_cell_box(metrics)[0:2], len(metrics))
+
+def read_pcf_table_of_contents(data):
+    (table_count,) = struct.unpack_from('<I', data, 4)
+    return dict(
+        (table_type, (table_format, offset))
+        for i in range(0, table_count)
+        for (table_type, table_format, _, offset) in [struct.unpack_from('<IIII', data, 8 + i * 16)])
+
+def get_pcf_table(tables, table_type):
+    if table_type not in tables:
+        raise ImageInputError(f'PCF file has no table of type {table_type}')
+    return tables[table_type]
+
+def get_byte_order(table_format):
+    return '>' if table_format & pcf_byte_mask else '<'
+
+def read_pcf_properties(data, table):
+    (table_format, offset) = table
+    order = get_byte_order(table_format)
+    (property_count,) = struct.unpack_from(f'{order}i', data, offset + 4)
+    entries_offset = offset + 8
+    entries = list(
+        struct.unpack_from(f'{order}ibi', data, entries_offset + i * 9)
+        for i in range(0, property_count))
+    padding = (4 - property_count % 4) % 4
+    strings_offset = entries_offset + property_count * 9 + padding + 4
+    def read_string(string_offset):
+        begin = strings_offset + string_offset
+        end = data.index(b'\0', begin)
+        return data[begin:end].decode('utf-8', errors='replace')
+    return dict(
+        (read_string(name_offset), read_string(value) if is_string else value)
+        for name_offset, is_string, value in entries)
+
+def read_pcf_metrics(data, table):
+    (table_format, offset) = table
+    order = get_byte_order(table_format)
+    if table_format & pcf_compressed_metrics:
+        (metrics_count,) = struct.unpack_from(f'{order}h', data, offset + 4)
+        return list(
+            tuple(value - 0x80 for value in struct.unpack_from('5B', data, offset + 6 + i * 5))
+            for i in range(0, metrics_count))
+    else:
+        (metrics_count,) = struct.unpack_from(f'{order}i', data, offset + 4)
+        return list(
+            struct.unpack_from(f'{order}5h', data, offset + 8 + i * 12)
+            for i in range(0, metrics_count))
+
+def calculate_cell_box(metrics):
+    left = min(metric[0] for metric in metrics)
+    right = max(metric[1] for metric in metrics)
+    ascent = max(metric[3] for metric in metrics)
+    descent = max(metric[4] for metric in metrics)
+    return (right - left, ascent + descent, left, -descent)
+
+def get_glyph_box(metric):
+    (left, right, _, ascent, descent) = metric
+    return (right - left, ascent + descent, left, -descent)
+
+def read_pcf_encodings(data, table):
+    (table_format, offset) = table
+    order = get_byte_order(table_format)
+    (min_byte2, max_byte2, min_byte1, max_byte1, default_encoding) = struct.unpack_from(f'{order}5h', data, offset + 4)
+    columns = max_byte2 - min_byte2 + 1
+    rows = max_byte1 - min_byte1 + 1
+    indices = struct.unpack_from(f'{order}{columns * rows}H', data, offset + 14)
+    encodings = list(
+        (((min_byte1 + i // columns) << 8) | (min_byte2 + i % columns), index)
+        for i, index in enumerate(indices)
+        if index != 0xFFFF)
+    return (encodings, default_encoding)
+
+def read_pcf_bitmaps(data, table, metrics):
+    (table_format, offset) = table
+    order = get_byte_order(table_format)
+    (glyph_count,) = struct.unpack_from(f'{order}i', data, offset + 4)
+    offsets = struct.unpack_from(f'{order}{glyph_count}i', data, offset + 8)
+    bitmap_sizes = struct.unpack_from(f'{order}4i', data, offset + 8 + glyph_count * 4)
+    bitmaps_offset = offset + 8 + glyph_count * 4 + 16
+    row_padding = 1 << (table_format & 3)
+    scan_unit = 1 << ((table_format >> 4) & 3)
+    is_msb_bit = bool(table_format & pcf_bit_mask)
+    is_msb_byte = bool(table_format & pcf_byte_mask)
+    block = numpy.frombuffer(data, numpy.uint8, bitmap_sizes[table_format & 3], bitmaps_offset)
+    if is_msb_byte != is_msb_bit and scan_unit > 1:
+        block = numpy.pad(block, (0, -len(block) % scan_unit))
+        block = block.reshape(-1, scan_unit)[:, ::-1].reshape(-1)
+    def get_bitmap(i):
+        (width, height, _, _) = get_glyph_box(metrics[i])
+        if width <= 0 or height <= 0:
+            return numpy.zeros((0, 0), bool)
+        row_bytes = (width + 7) // 8
+        row_bytes += -row_bytes % row_padding
+        begin = offsets[i]
+        rows = block[begin : begin + row_bytes * height].reshape(height, row_bytes)
+        pixels = numpy.unpackbits(rows, axis=1, bitorder='big' if is_msb_bit else 'little')
+        return pixels[:, 0 : width].astype(bool)
+    return get_bitmap
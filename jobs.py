@@ -0,0 +1,193 @@
+from collections import namedtuple
+from compiler import CompiledFont
+from executor import CompileQueueFullError
+from threading import Event, Lock, Thread, local
+import json
+import sqlite3
+import time
+import uuid
+
+Job = namedtuple(
+    'Job',
+    [
+        'id',
+        'status',
+        'options',
+        'created',
+        'updated',
+        'error',
+        'error_status',
+    ])
+
+finished_statuses = ['done', 'failed']
+
+job_columns = 'id, status, options, created, updated, error, error_status'
+
+class JobStore:
+    def __init__(self, path, max_queued, ttl, stale_after):
+        self.path = path
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.connections = local()
+        with self.transaction() as connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    error TEXT,
+                    error_status INTEGER,
+                    data BLOB,
+                    filename TEXT,
+                    result BLOB)''')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)')
+
+    def connect(self):
+        connection = getattr(self.connections, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self.connections.connection = connection
+        return connection
+
+    def transaction(self):
+        return Transaction(self.connect())
+
+    def submit(self, data, options):
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self.transaction() as connection:
+            connection.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?',
+                (*finished_statuses, now - self.ttl))
+            (queued,) = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()
+            if queued >= self.max_queued:
+                raise CompileQueueFullError('Too many compile jobs waiting')
+            connection.execute(
+                "INSERT INTO jobs (id, status, options, created, updated, data) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(options), now, now, data))
+        return self.get(job_id)
+
+    def claim(self):
+        now = time.time()
+        with self.transaction() as connection:
+            row = connection.execute(
+                f'''SELECT {job_columns}, data FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND updated < ?)
+                    ORDER BY created LIMIT 1''',
+                (now - self.stale_after,)).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', updated = ? WHERE id = ?",
+                (now, row[0]))
+        return (create_job(row[:-1])._replace(status='running'), row[-1])
+
+    def requeue(self, job_id):
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'queued', updated = ? WHERE id = ?",
+                (time.time(), job_id))
+
+    def complete(self, job_id, compiled_font):
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'done', updated = ?, data = NULL, filename = ?, result = ? WHERE id = ?",
+                (time.time(), compiled_font.filename, compiled_font.data, job_id))
+
+    def fail(self, job_id, error_status, error):
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', updated = ?, data = NULL, error = ?, error_status = ? WHERE id = ?",
+                (time.time(), error, error_status, job_id))
+
+    def get(self, job_id):
+        row = self.connect().execute(
+            f'SELECT {job_columns} FROM jobs WHERE id = ?',
+            (job_id,)).fetchone()
+        return create_job(row) if row else None
+
+    def get_result(self, job_id):
+        row = self.connect().execute(
+            "SELECT filename, result FROM jobs WHERE id = ? AND status = 'done'",
+            (job_id,)).fetchone()
+        return CompiledFont(filename=row[0], data=row[1]) if row else None
+
+    def wait(self, job_id, timeout, poll_interval=0.2):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job.status in finished_statuses or time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+class Transaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, error_type, error, traceback):
+        self.connection.execute('ROLLBACK' if error_type else 'COMMIT')
+
+def create_job(row):
+    (job_id, status, options, created, updated, error, error_status) = row
+    return Job(
+        id=job_id,
+        status=status,
+        options=json.loads(options),
+        created=created,
+        updated=updated,
+        error=error,
+        error_status=error_status)
+
+class JobRunner:
+    def __init__(self, job_store, handler, get_error_status, threads, poll_interval=1):
+        self.job_store = job_store
+        self.handler = handler
+        self.get_error_status = get_error_status
+        self.poll_interval = poll_interval
+        self.wake = Event()
+        self.thread_count = threads
+        self.threads = []
+        self.start_lock = Lock()
+
+    def start(self):
+        with self.start_lock:
+            if not self.threads:
+                self.threads = list(
+                    Thread(target=self.work, daemon=True)
+                    for _ in range(0, self.thread_count))
+                for thread in self.threads:
+                    thread.start()
+
+    def notify(self):
+        self.start()
+        self.wake.set()
+
+    def work(self):
+        while True:
+            claimed = self.job_store.claim()
+            if claimed is None:
+                self.wake.wait(self.poll_interval)
+                self.wake.clear()
+            else:
+                self.run(*claimed)
+
+    def run(self, job, data):
+        try:
+            compiled_font = self.handler(data, job.options)
+        except CompileQueueFullError:
+            self.job_store.requeue(job.id)
+            time.sleep(self.poll_interval)
+        except Exception as error:
+            self.job_store.fail(job.id, *self.get_error_status(error))
+        else:
+            self.job_store.complete(job.id, compiled_font)
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+import time
+
+class Timings:
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def span(self, stage):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((stage, time.perf_counter() - begin))
+
+def format_server_timing(spans):
+    return ', '.join(
+        f'{stage};dur={seconds * 1000:.1f}'
+        for stage, seconds in spans)
+
+def get_glyph_count_bucket(glyph_count):
+    bucket = 1
+    while bucket < glyph_count:
+        bucket *= 2
+    return bucket
+
+default_buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]
+
+class Histogram:
+    def __init__(self, name, description, label_names, buckets=default_buckets):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = defaultdict(lambda: [0] * (len(buckets) + 2))
+        self.lock = Lock()
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            counts = self.series[label_values]
+            for i, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            for label_values, counts in sorted(self.series.items()):
+                labels = ','.join(
+                    f'{name}="{value}"'
+                    for name, value in zip(self.label_names, label_values))
+                for bucket, count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bucket}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {counts[-2]}')
+                lines.append(f'{self.name}_sum{{{labels}}} {counts[-1]}')
+                lines.append(f'{self.name}_count{{{labels}}} {counts[-2]}')
+        return '\n'.join(lines) + '\n'
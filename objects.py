@@ -6,8 +6,12 @@ BitFont = namedtuple(
         'size',
         'info',
         'glyphs',
+        'x_height',
+        'kept_codepoints',
     ])
 
+BitFont.__new__.__defaults__ = (None, None)
+
 BitInfo = namedtuple(
     'BitInfo',
     [
@@ -22,12 +26,89 @@ BitInfo = namedtuple(
         'is_ofl',
     ])
 
-BitGlyph = namedtuple(
-    'BitGlyph',
-    [
-        'codepoint',
-        'bits',
-    ])
+class PackedBits:
+    __slots__ = ('value', 'length')
+
+    def __init__(self, value, length):
+        self.value = value
+        self.length = length
+
+    @classmethod
+    def pack(cls, bits):
+        if isinstance(bits, PackedBits):
+            return bits
+        bits = list(bits)
+        digits = ''.join('1' if bit else '0' for bit in reversed(bits))
+        return cls(int(digits or '0', 2), len(bits))
+
+    @classmethod
+    def from_bytes(cls, data, length):
+        return cls(int.from_bytes(data, 'little'), length)
+
+    @classmethod
+    def blank(cls, length):
+        return cls(0, length)
+
+    def to_bytes(self):
+        return self.value.to_bytes((self.length + 7) // 8, 'little')
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('PackedBits index out of range')
+        return bool((self.value >> index) & 1)
+
+    def __iter__(self):
+        value = self.value
+        for _ in range(0, self.length):
+            yield bool(value & 1)
+            value >>= 1
+
+    def __eq__(self, other):
+        if isinstance(other, PackedBits):
+            return self.value == other.value and self.length == other.length
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.value, self.length))
+
+    def __repr__(self):
+        return f'PackedBits({self.value:#x}, {self.length})'
+
+    def is_blank(self):
+        return self.value == 0
+
+    def count_leading_blanks(self):
+        if self.value == 0:
+            return self.length
+        return (self.value & -self.value).bit_length() - 1
+
+    def indices(self):
+        value = self.value
+        while value:
+            lowest = value & -value
+            yield lowest.bit_length() - 1
+            value ^= lowest
+
+    def get_row(self, y, width):
+        return PackedBits((self.value >> (y * width)) & ((1 << width) - 1), width)
+
+    def get_column(self, x, width):
+        height = self.length // width
+        digits = format(self.value >> x, f'0{self.length}b')[::-1]
+        return PackedBits(int(digits[0 : height * width : width][::-1] or '0', 2), height)
+
+class BitGlyph(namedtuple('BitGlyph', ['codepoint', 'bits'])):
+    __slots__ = ()
+
+    def __new__(cls, codepoint, bits):
+        return super().__new__(cls, codepoint, PackedBits.pack(bits))
 
 BitMetrics = namedtuple(
     'BitMetrics',
@@ -0,0 +1,69 @@
+from collections import defaultdict
+
+def trace_outlines(size, bits):
+    edges = find_boundary_edges(size, bits)
+    while edges:
+        yield simplify_outline(trace_outline(edges))
+
+def find_boundary_edges(size, bits):
+    (width, _) = size
+    pixels = list(
+        (i % width, i // width)
+        for i in bits.indices())
+    filled = set(pixels)
+    edges = defaultdict(list)
+    for (x, y) in pixels:
+        if (x, y - 1) not in filled:
+            edges[(x + 1, y)].append((x, y))
+        if (x - 1, y) not in filled:
+            edges[(x, y)].append((x, y + 1))
+        if (x, y + 1) not in filled:
+            edges[(x, y + 1)].append((x + 1, y + 1))
+        if (x + 1, y) not in filled:
+            edges[(x + 1, y + 1)].append((x + 1, y))
+    return edges
+
+def trace_outline(edges):
+    start = min(edges)
+    outline = [start]
+    direction = None
+    point = start
+    while True:
+        next_point = take_edge(edges, point, direction)
+        direction = get_direction(point, next_point)
+        point = next_point
+        if point == start:
+            return outline
+        outline.append(point)
+
+def take_edge(edges, point, direction):
+    ends = edges[point]
+    if len(ends) > 1 and direction:
+        turn = turn_towards_fill(direction)
+        end = next(
+            end for end in ends
+            if get_direction(point, end) == turn)
+    else:
+        end = ends[0]
+    ends.remove(end)
+    if not ends:
+        del edges[point]
+    return end
+
+def get_direction(begin, end):
+    return (end[0] - begin[0], end[1] - begin[1])
+
+def turn_towards_fill(direction):
+    (x, y) = direction
+    return (y, -x)
+
+def simplify_outline(outline):
+    def is_corner(i):
+        before = outline[i - 1]
+        point = outline[i]
+        after = outline[(i + 1) % len(outline)]
+        return get_direction(before, point) != get_direction(point, after)
+    return [
+        point
+        for i, point in enumerate(outline)
+        if is_corner(i)]
@@ -0,0 +1,558 @@
+from collections import namedtuple
+from fontTools.fontBuilder import FontBuilder
+from fontTools.misc.arrayTools import calcIntBounds
+from fontTools.misc.timeTools import timestampSinceEpoch
+from fontTools.misc.psCharStrings import T2CharString
+from fontTools.pens.t2CharStringPen import T2CharStringPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables.DefaultTable import DefaultTable
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+from functools import partial
+from incremental import GlyphStore
+from input import ImageInputError
+from io import BytesIO
+from objects import PackedBits
+from outlines import trace_outlines
+from transforms import (
+    calculate_bit_metrics,
+    add_extra_bit_glyphs,
+    get_glyph_name,
+    transform_pixels_to_units,
+    find_base_glyph_names,
+    ofl_license,
+    ofl_license_url)
+import codepoints
+import numpy
+import string
+import struct
+
+head_timestamp = timestampSinceEpoch(0)
+
+def freeze_timestamps(font):
+    font.recalcTimestamp = False
+    font['head'].created = head_timestamp
+    font['head'].modified = head_timestamp
+
+def build_font(bit_font, extension, glyph_store=None):
+    glyph_store = glyph_store or GlyphStore(bit_font.size)
+    bit_metrics = calculate_bit_metrics(bit_font)
+    all_bit_glyphs = add_extra_bit_glyphs(bit_font, bit_metrics)
+    builder = FontBuilder(
+        bit_metrics.units_per_em,
+        isTTF=(extension == 'ttf'))
+    base_glyph_names = setup_glyph_order(builder, all_bit_glyphs)
+    setup_glyph_tables(builder, bit_metrics, bit_font.info, all_bit_glyphs, base_glyph_names, glyph_store)
+    setup_tables(builder, bit_metrics, bit_font.info, all_bit_glyphs)
+    font_file = BytesIO()
+    builder.save(font_file)
+    return font_file.getvalue()
+
+def build_font_streaming(bit_font, extension):
+    bit_metrics = calculate_bit_metrics(bit_font)
+    all_bit_glyphs = add_extra_bit_glyphs(bit_font, bit_metrics)
+    builder = FontBuilder(
+        bit_metrics.units_per_em,
+        isTTF=(extension == 'ttf'))
+    builder.font.recalcBBoxes = False
+    base_glyph_names = setup_glyph_order(builder, all_bit_glyphs)
+    compiled_glyphs = setup_streamed_glyph_tables(builder, bit_metrics, bit_font.info, all_bit_glyphs, base_glyph_names)
+    setup_tables(builder, bit_metrics, bit_font.info, all_bit_glyphs)
+    update_glyph_bounds(builder, compiled_glyphs)
+    font_file = BytesIO()
+    builder.save(font_file)
+    return font_file.getvalue()
+
+def setup_glyph_order(builder, bit_glyphs):
+    builder.setupGlyphOrder(get_glyph_order(bit_glyphs))
+    builder.setupCharacterMap(get_character_map(bit_glyphs))
+    return find_base_glyph_names(bit_glyphs)
+
+def setup_glyph_tables(builder, bit_metrics, bit_info, bit_glyphs, base_glyph_names, glyph_store):
+    if builder.isTTF:
+        glyph_set = set(builder.font.getGlyphOrder())
+        builder.setupGlyf(dict(
+            (get_glyph_name(bit_glyph.codepoint), draw_tt_glyph(bit_metrics, glyph_store, base_glyph_names, glyph_set, bit_glyph))
+            for bit_glyph in bit_glyphs))
+    else:
+        builder.setupCFF(
+            get_postscript_name(bit_info),
+            get_cff_font_info(bit_info),
+            draw_t2_char_strings(bit_metrics, glyph_store, base_glyph_names, bit_glyphs),
+            get_cff_private_dict(bit_metrics))
+
+def setup_tables(builder, bit_metrics, bit_info, bit_glyphs):
+    builder.setupHorizontalMetrics(dict(
+        (get_glyph_name(bit_glyph.codepoint), (bit_metrics.total_advance, find_left_side_bearing(bit_metrics, bit_glyph)))
+        for bit_glyph in bit_glyphs))
+    builder.setupHorizontalHeader(
+        ascent=bit_metrics.ascender,
+        descent=bit_metrics.descender,
+        lineGap=0)
+    builder.setupNameTable(get_name_strings(bit_info), mac=False)
+    builder.setupOS2(**get_os2_values(bit_metrics, bit_info))
+    builder.setupPost(
+        keepGlyphNames=builder.isTTF,
+        underlinePosition=-bit_metrics.units_per_pixel // 2,
+        underlineThickness=bit_metrics.units_per_pixel,
+        isFixedPitch=1)
+    builder.updateHead(
+        created=head_timestamp,
+        modified=head_timestamp,
+        fontRevision=get_version_number(bit_info),
+        macStyle=get_mac_style(bit_info),
+        lowestRecPPEM=bit_metrics.height)
+
+def get_glyph_order(bit_glyphs):
+    glyph_names = list(
+        get_glyph_name(bit_glyph.codepoint)
+        for bit_glyph in bit_glyphs)
+    return (['.notdef']
+        + list(name for name in glyph_names if name != '.notdef'))
+
+def get_character_map(bit_glyphs):
+    return dict(
+        (ord(bit_glyph.codepoint), get_glyph_name(bit_glyph.codepoint))
+        for bit_glyph in bit_glyphs
+        if bit_glyph.codepoint != codepoints.replacement_character)
+
+def find_left_side_bearing(bit_metrics, bit_glyph):
+    filled_columns = list(
+        i % bit_metrics.width
+        for i in bit_glyph.bits.indices())
+    if filled_columns:
+        return bit_metrics.left_advance + bit_metrics.units_per_pixel * min(filled_columns)
+    else:
+        return 0
+
+def get_outlines(bit_metrics, glyph_store, bit_glyph):
+    for points in glyph_store.get_outlines(bit_glyph.bits):
+        yield list(map(
+            partial(transform_pixels_to_units, bit_metrics),
+            points))
+
+def draw_outlines(pen, outlines):
+    for points in outlines:
+        pen.moveTo(points[0])
+        for point in points[1:]:
+            pen.lineTo(point)
+        pen.closePath()
+
+def draw_tt_glyph(bit_metrics, glyph_store, base_glyph_names, glyph_set, bit_glyph):
+    base_glyph_name = base_glyph_names.get(bit_glyph.codepoint)
+    if base_glyph_name:
+        pen = TTGlyphPen(glyph_set)
+        pen.addComponent(base_glyph_name, (1, 0, 0, 1, 0, 0))
+        return pen.glyph()
+    else:
+        glyph = Glyph(glyph_store.get_glyph_data(
+            'ttf',
+            bit_glyph.bits,
+            lambda: compile_tt_glyph(bit_metrics, glyph_store, bit_glyph)))
+        glyph.expand(None)
+        return glyph
+
+def compile_tt_glyph(bit_metrics, glyph_store, bit_glyph):
+    return compile_tt_outlines(get_outlines(bit_metrics, glyph_store, bit_glyph))
+
+def compile_tt_outlines(outlines):
+    pen = TTGlyphPen(None)
+    draw_outlines(
+        pen,
+        (list(reversed(points)) for points in outlines))
+    return pen.glyph().compile(None)
+
+def draw_t2_char_strings(bit_metrics, glyph_store, base_glyph_names, bit_glyphs):
+    char_strings = {}
+    for bit_glyph in bit_glyphs:
+        if bit_glyph.codepoint not in base_glyph_names:
+            char_strings[get_glyph_name(bit_glyph.codepoint)] = draw_t2_char_string(bit_metrics, glyph_store, bit_glyph)
+    for codepoint, base_glyph_name in base_glyph_names.items():
+        char_strings[get_glyph_name(codepoint)] = char_strings[base_glyph_name]
+    return char_strings
+
+def draw_t2_char_string(bit_metrics, glyph_store, bit_glyph):
+    program = glyph_store.get_glyph_data(
+        'otf',
+        bit_glyph.bits,
+        lambda: compile_t2_program(bit_metrics, glyph_store, bit_glyph))
+    return T2CharString(program=list(program))
+
+def compile_t2_program(bit_metrics, glyph_store, bit_glyph):
+    pen = T2CharStringPen(bit_metrics.total_advance, None)
+    draw_outlines(pen, get_outlines(bit_metrics, glyph_store, bit_glyph))
+    return pen.getCharString().program
+
+def compile_t2_outlines(bit_metrics, outlines):
+    pen = T2CharStringPen(bit_metrics.total_advance, None)
+    draw_outlines(pen, outlines)
+    char_string = pen.getCharString()
+    char_string.compile()
+    return char_string.bytecode
+
+CompiledGlyph = namedtuple(
+    'CompiledGlyph',
+    [
+        'data',
+        'bounds',
+        'points',
+        'contours',
+        'components',
+    ])
+
+empty_compiled_glyph = CompiledGlyph(data=b'', bounds=None, points=0, contours=0, components=0)
+
+def setup_streamed_glyph_tables(builder, bit_metrics, bit_info, bit_glyphs, base_glyph_names):
+    compiled_glyphs = dict(stream_compiled_glyphs(builder, bit_metrics, bit_glyphs, base_glyph_names))
+    if builder.isTTF:
+        glyf = newTable('glyf')
+        glyf.glyphOrder = builder.font.getGlyphOrder()
+        glyf.glyphs = dict(
+            (glyph_name, Glyph(compiled_glyph.data))
+            for glyph_name, compiled_glyph in compiled_glyphs.items())
+        builder.font['loca'] = newTable('loca')
+        builder.font['glyf'] = glyf
+    else:
+        builder.setupCFF(
+            get_postscript_name(bit_info),
+            get_cff_font_info(bit_info),
+            dict(
+                (glyph_name, T2CharString(bytecode=compiled_glyph.data))
+                for glyph_name, compiled_glyph in compiled_glyphs.items()),
+            get_cff_private_dict(bit_metrics))
+    return compiled_glyphs
+
+def stream_compiled_glyphs(builder, bit_metrics, bit_glyphs, base_glyph_names):
+    glyph_ids = dict(
+        (glyph_name, glyph_id)
+        for glyph_id, glyph_name in enumerate(builder.font.getGlyphOrder()))
+    compiled_base_glyphs = {}
+    for bit_glyph in bit_glyphs:
+        if bit_glyph.codepoint not in base_glyph_names:
+            glyph_name = get_glyph_name(bit_glyph.codepoint)
+            outlines = list(trace_glyph_outlines(bit_metrics, bit_glyph))
+            if builder.isTTF:
+                compiled_glyph = summarize_tt_glyph(compile_tt_outlines(outlines))
+            else:
+                compiled_glyph = summarize_t2_glyph(compile_t2_outlines(bit_metrics, outlines), outlines)
+            compiled_base_glyphs[glyph_name] = compiled_glyph
+            yield (glyph_name, compiled_glyph)
+    for codepoint, base_glyph_name in base_glyph_names.items():
+        compiled_glyph = compiled_base_glyphs[base_glyph_name]
+        if builder.isTTF:
+            compiled_glyph = compile_tt_component(glyph_ids, base_glyph_name, compiled_glyph)
+        yield (get_glyph_name(codepoint), compiled_glyph)
+
+def trace_glyph_outlines(bit_metrics, bit_glyph):
+    for points in trace_outlines((bit_metrics.width, bit_metrics.height), bit_glyph.bits):
+        yield list(map(
+            partial(transform_pixels_to_units, bit_metrics),
+            points))
+
+def summarize_tt_glyph(data):
+    if not data:
+        return empty_compiled_glyph
+    (contours, x_min, y_min, x_max, y_max) = tt_glyph_header.unpack_from(data)
+    (last_point,) = tt_end_point.unpack_from(data, tt_glyph_header.size + tt_end_point.size * (contours - 1))
+    return CompiledGlyph(
+        data=data,
+        bounds=(x_min, y_min, x_max, y_max),
+        points=last_point + 1,
+        contours=contours,
+        components=0)
+
+tt_glyph_header = struct.Struct('>hhhhh')
+tt_end_point = struct.Struct('>H')
+
+def compile_tt_component(glyph_ids, base_glyph_name, base_compiled_glyph):
+    pen = TTGlyphPen(glyph_ids)
+    pen.addComponent(base_glyph_name, (1, 0, 0, 1, 0, 0))
+    glyph = pen.glyph()
+    if base_compiled_glyph.bounds:
+        (glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax) = base_compiled_glyph.bounds
+    else:
+        (glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax) = (0, 0, 0, 0)
+    return base_compiled_glyph._replace(
+        data=glyph.compile(GlyphIds(glyph_ids), recalcBBoxes=False),
+        components=1)
+
+class GlyphIds:
+    def __init__(self, glyph_ids):
+        self.glyph_ids = glyph_ids
+
+    def getGlyphID(self, glyph_name):
+        return self.glyph_ids[glyph_name]
+
+def summarize_t2_glyph(data, outlines):
+    points = list(point for contour in outlines for point in contour)
+    return CompiledGlyph(
+        data=data,
+        bounds=calcIntBounds(points) if points else None,
+        points=len(points),
+        contours=len(outlines),
+        components=0)
+
+def update_glyph_bounds(builder, compiled_glyphs):
+    font = builder.font
+    glyph_bounds = list(
+        (glyph_name, compiled_glyph.bounds)
+        for glyph_name, compiled_glyph in compiled_glyphs.items()
+        if compiled_glyph.bounds)
+    font_bounds = (0, 0, 0, 0)
+    if glyph_bounds:
+        font_bounds = (
+            min(bounds[0] for _, bounds in glyph_bounds),
+            min(bounds[1] for _, bounds in glyph_bounds),
+            max(bounds[2] for _, bounds in glyph_bounds),
+            max(bounds[3] for _, bounds in glyph_bounds))
+    (font['head'].xMin, font['head'].yMin, font['head'].xMax, font['head'].yMax) = font_bounds
+    if builder.isTTF:
+        update_tt_maximums(font, compiled_glyphs, glyph_bounds)
+    else:
+        font['CFF '].cff.topDictIndex[0].FontBBox = list(font_bounds)
+    update_horizontal_extents(font, glyph_bounds)
+
+def update_tt_maximums(font, compiled_glyphs, glyph_bounds):
+    simple_glyphs = list(
+        compiled_glyph
+        for compiled_glyph in compiled_glyphs.values()
+        if compiled_glyph.contours and not compiled_glyph.components)
+    composite_glyphs = list(
+        compiled_glyph
+        for compiled_glyph in compiled_glyphs.values()
+        if compiled_glyph.contours and compiled_glyph.components)
+    maxp = font['maxp']
+    maxp.maxPoints = max((glyph.points for glyph in simple_glyphs), default=0)
+    maxp.maxContours = max((glyph.contours for glyph in simple_glyphs), default=0)
+    maxp.maxCompositePoints = max((glyph.points for glyph in composite_glyphs), default=0)
+    maxp.maxCompositeContours = max((glyph.contours for glyph in composite_glyphs), default=0)
+    maxp.maxComponentElements = max((glyph.components for glyph in composite_glyphs), default=0)
+    maxp.maxComponentDepth = 1 if composite_glyphs else 0
+    if all(font['hmtx'][glyph_name][1] == bounds[0] for glyph_name, bounds in glyph_bounds):
+        font['head'].flags |= 0x2
+    else:
+        font['head'].flags &= ~0x2
+
+def update_horizontal_extents(font, glyph_bounds):
+    hhea = font['hhea']
+    hhea.advanceWidthMax = max(advance for advance, _ in font['hmtx'].metrics.values())
+    (hhea.minLeftSideBearing, hhea.minRightSideBearing, hhea.xMaxExtent) = (0, 0, 0)
+    if glyph_bounds:
+        side_bearings = list(
+            (font['hmtx'][glyph_name], bounds[2] - bounds[0])
+            for glyph_name, bounds in glyph_bounds)
+        hhea.minLeftSideBearing = min(lsb for (_, lsb), _ in side_bearings)
+        hhea.minRightSideBearing = min(advance - lsb - width for (advance, lsb), width in side_bearings)
+        hhea.xMaxExtent = max(lsb + width for (_, lsb), width in side_bearings)
+
+def get_cff_font_info(bit_info):
+    return {
+        'FamilyName': bit_info.family_name,
+        'FullName': get_full_name(bit_info),
+        'Weight': bit_info.style_name,
+        'isFixedPitch': 1,
+    }
+
+def get_cff_private_dict(bit_metrics):
+    return {
+        'BlueValues': bit_metrics.values,
+        'BlueScale': bit_metrics.scale,
+        'BlueShift': 0,
+        'BlueFuzz': 0,
+        'StdHW': bit_metrics.stems[0],
+        'StdVW': bit_metrics.stems[0],
+        'StemSnapH': bit_metrics.stems,
+        'StemSnapV': bit_metrics.stems,
+    }
+
+def get_name_strings(bit_info):
+    version_string = get_version_string(bit_info)
+    postscript_name = get_postscript_name(bit_info)
+    name_strings = [
+        ('copyright', f'Copyright {bit_info.copyright_year} {bit_info.designer}'),
+        ('familyName', bit_info.family_name),
+        ('styleName', bit_info.style_name),
+        ('uniqueFontIdentifier', f'{version_string};NONE;{postscript_name}'),
+        ('fullName', get_full_name(bit_info)),
+        ('version', f'Version {version_string}'),
+        ('psName', postscript_name),
+        ('designer', bit_info.designer),
+        ('designerURL', bit_info.designer_url),
+        ('licenseDescription', ofl_license if bit_info.is_ofl else None),
+        ('licenseInfoURL', ofl_license_url if bit_info.is_ofl else None),
+    ]
+    return dict(
+        (key, value)
+        for key, value in name_strings
+        if value is not None)
+
+def get_os2_values(bit_metrics, bit_info):
+    return {
+        'version': 4,
+        'xAvgCharWidth': bit_metrics.total_advance,
+        'usWeightClass': bit_info.weight,
+        'fsType': 0 if bit_info.is_ofl else 0x0004,
+        'fsSelection': get_fs_selection(bit_info),
+        'achVendID': 'NONE',
+        'sTypoAscender': bit_metrics.ascender,
+        'sTypoDescender': bit_metrics.descender,
+        'sTypoLineGap': 0,
+        'usWinAscent': bit_metrics.ascender,
+        'usWinDescent': -bit_metrics.descender,
+        'sxHeight': round(bit_metrics.x_height),
+        'sCapHeight': bit_metrics.units_per_em,
+        'yStrikeoutSize': bit_metrics.units_per_pixel,
+        'yStrikeoutPosition': round(bit_metrics.x_height * 0.6),
+    }
+
+def get_fs_selection(bit_info):
+    style = bit_info.style_name.lower()
+    italic = 0x0001 if 'italic' in style else 0
+    bold = 0x0020 if 'bold' in style else 0
+    return (italic | bold) or 0x0040
+
+def get_mac_style(bit_info):
+    style = bit_info.style_name.lower()
+    bold = 0x0001 if 'bold' in style else 0
+    italic = 0x0002 if 'italic' in style else 0
+    return bold | italic
+
+def get_version_number(bit_info):
+    return (bit_info.major_version or 0) + (bit_info.minor_version or 0) / 1000
+
+def get_version_string(bit_info):
+    return '%d.%03d' % (bit_info.major_version or 0, bit_info.minor_version or 0)
+
+def get_full_name(bit_info):
+    return f'{bit_info.family_name} {bit_info.style_name}'
+
+postscript_characters = set(string.printable) - set(string.whitespace) - set('[](){}<>/%')
+
+def get_postscript_name(bit_info):
+    name = f'{bit_info.family_name}-{bit_info.style_name}'
+    return ''.join(
+        character
+        for character in name
+        if character in postscript_characters)
+
+def convert_flavor(data, flavor):
+    font = TTFont(BytesIO(data), recalcTimestamp=False)
+    font.flavor = flavor
+    font_file = BytesIO()
+    font.save(font_file)
+    return font_file.getvalue()
+
+BitmapStrikes = namedtuple(
+    'BitmapStrikes',
+    [
+        'scales',
+        'outlines',
+    ])
+
+no_bitmap_strikes = BitmapStrikes(scales=(), outlines=True)
+
+def add_bitmap_strikes(data, bit_font, bitmap_strikes):
+    font = TTFont(BytesIO(data), recalcTimestamp=False)
+    bit_metrics = calculate_bit_metrics(bit_font)
+    glyph_bits = get_glyph_order_bits(
+        font,
+        add_extra_bit_glyphs(bit_font, bit_metrics),
+        bit_metrics)
+    for scale in bitmap_strikes.scales:
+        check_strike_scale(bit_font.size, scale)
+    (font['EBLC'], font['EBDT']) = build_strike_tables(
+        bit_font.size,
+        glyph_bits,
+        bitmap_strikes.scales)
+    if not bitmap_strikes.outlines:
+        remove_outlines(font)
+    font_file = BytesIO()
+    font.save(font_file)
+    return font_file.getvalue()
+
+def get_glyph_order_bits(font, bit_glyphs, bit_metrics):
+    codepoint_bits = dict(
+        (bit_glyph.codepoint, bit_glyph.bits)
+        for bit_glyph in bit_glyphs)
+    glyph_codepoints = dict(
+        (glyph_name, chr(codepoint))
+        for codepoint, glyph_name in font.getBestCmap().items())
+    glyph_codepoints['.notdef'] = codepoints.replacement_character
+    blank_bits = PackedBits.blank(bit_metrics.width * bit_metrics.height)
+    return list(
+        codepoint_bits.get(glyph_codepoints.get(glyph_name), blank_bits)
+        for glyph_name in font.getGlyphOrder())
+
+def check_strike_scale(size, scale):
+    (width, height) = size
+    if (height + 1) * scale > 127 or (width + 1) * scale > 255:
+        raise ImageInputError(f'Glyph size {width}x{height} too large for a {scale}x bitmap strike')
+
+eblc_header = struct.Struct('>LL')
+bitmap_size = struct.Struct('>LLLL12s12sHHBBBb')
+sbit_line_metrics = struct.Struct('>bbBbbbbbbbbb')
+index_sub_table_array = struct.Struct('>HHL')
+index_sub_table_2 = struct.Struct('>HHLL8s')
+big_glyph_metrics = struct.Struct('>BBbbBbbB')
+
+def build_strike_tables(size, glyph_bits, scales):
+    (width, height) = size
+    index_offset = eblc_header.size + bitmap_size.size * len(scales)
+    index_size = index_sub_table_array.size + index_sub_table_2.size
+    bitmap_sizes = []
+    index_tables = []
+    image_data = [struct.pack('>L', 0x00020000)]
+    image_offset = len(image_data[0])
+    for i, scale in enumerate(scales):
+        images = list(
+            get_strike_image(size, bits, scale)
+            for bits in glyph_bits)
+        line_metrics = sbit_line_metrics.pack(
+            (height + 1) * scale, -scale, width * scale,
+            1, 0, 0,
+            0, scale, height * scale, 0,
+            0, 0)
+        bitmap_sizes.append(bitmap_size.pack(
+            index_offset + index_size * i, index_size, 1, 0,
+            line_metrics, line_metrics,
+            0, len(glyph_bits) - 1,
+            height * scale, height * scale, 1, 0x01))
+        index_tables.append(index_sub_table_array.pack(
+            0, len(glyph_bits) - 1, index_sub_table_array.size))
+        index_tables.append(index_sub_table_2.pack(
+            2, 5, image_offset, len(images[0]),
+            big_glyph_metrics.pack(
+                height * scale, width * scale,
+                0, height * scale, (width + 1) * scale,
+                -(width * scale // 2), 0, height * scale)))
+        image_data.extend(images)
+        image_offset += sum(map(len, images))
+    return (
+        create_raw_table('EBLC', b''.join(
+            [eblc_header.pack(0x00020000, len(scales))]
+            + bitmap_sizes
+            + index_tables)),
+        create_raw_table('EBDT', b''.join(image_data)))
+
+def get_strike_image(size, bits, scale):
+    (width, height) = size
+    pixels = numpy.unpackbits(
+        numpy.frombuffer(bits.to_bytes(), numpy.uint8),
+        count=len(bits),
+        bitorder='little').reshape(height, width)
+    scaled_pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+    return numpy.packbits(scaled_pixels).tobytes()
+
+def create_raw_table(tag, data):
+    table = DefaultTable(tag)
+    table.data = data
+    return table
+
+def remove_outlines(font):
+    if 'glyf' not in font:
+        raise ValueError('Bitmap-only fonts need TrueType outlines')
+    glyf = font['glyf']
+    for glyph_name in font.getGlyphOrder():
+        glyf[glyph_name] = Glyph()
+        (advance, _) = font['hmtx'][glyph_name]
+        font['hmtx'][glyph_name] = (advance, 0)
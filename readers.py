@@ -0,0 +1,104 @@
+from input import ImageInputError, calculate_compile_cost, check_glyph_pixels, check_glyph_size, check_upload_size, default_image_limits, open_bit_font, open_source
+from input_bdf import count_bdf_glyphs, read_bdf_font
+from input_packed import count_packed_binary_glyphs, count_packed_json_glyphs, packed_magic, read_packed_binary_font, read_packed_json_font
+from input_pcf import count_pcf_glyphs, pcf_magic, read_pcf_font
+from objects import BitGlyph, PackedBits
+from utils import distinct_by
+import codepoints
+import input
+import numpy
+
+def read_bit_font(source, limits=None):
+    limits = limits or default_image_limits
+    input_format = sniff_input_format(source)
+    if input_format == 'raster':
+        return open_bit_font(source, limits)
+    try:
+        check_upload_size(source, limits)
+        with open_source(source) as source_file:
+            bit_font = font_readers[input_format](source_file, limits)
+    except ImageInputError:
+        raise
+    except Exception as exception:
+        raise ImageInputError(f'Unknown {input_format} font error') from exception
+    return complete_bit_font(bit_font)
+
+font_readers = {
+    'bdf': read_bdf_font,
+    'pcf': read_pcf_font,
+    'packed-binary': read_packed_binary_font,
+    'packed-json': read_packed_json_font,
+}
+
+def sniff_input_format(source):
+    with open_source(source) as source_file:
+        position = source_file.tell()
+        header = source_file.read(16)
+        source_file.seek(position)
+    if header.startswith(b'\xef\xbb\xbf'):
+        header = header[3:]
+    if header.startswith(b'STARTFONT'):
+        return 'bdf'
+    elif header.startswith(pcf_magic):
+        return 'pcf'
+    elif header.startswith(packed_magic):
+        return 'packed-binary'
+    elif header.lstrip().startswith(b'{'):
+        return 'packed-json'
+    else:
+        return 'raster'
+
+def complete_bit_font(bit_font):
+    glyphs = list(distinct_by(
+        lambda bit_glyph: bit_glyph.codepoint,
+        (bit_glyph
+            for bit_glyph in bit_font.glyphs
+            if bit_glyph.codepoint == codepoints.replacement_character
+                or codepoints.has_name(bit_glyph.codepoint))))
+    replacement_glyphs = list(
+        bit_glyph
+        for bit_glyph in glyphs
+        if bit_glyph.codepoint == codepoints.replacement_character)
+    other_glyphs = list(
+        bit_glyph
+        for bit_glyph in glyphs
+        if bit_glyph.codepoint != codepoints.replacement_character)
+    return bit_font._replace(glyphs=other_glyphs + (replacement_glyphs or [create_replacement_glyph(bit_font.size)]))
+
+def create_replacement_glyph(glyph_size):
+    (width, height) = glyph_size
+    pixels = numpy.ones((height, width), bool)
+    pixels[1 : height - 1, 1 : width - 1] = False
+    return BitGlyph(
+        codepoint=codepoints.replacement_character,
+        bits=PackedBits.from_bytes(numpy.packbits(pixels, bitorder='little').tobytes(), pixels.size))
+
+def estimate_compile_cost(source, limits=None):
+    limits = limits or default_image_limits
+    input_format = sniff_input_format(source)
+    if input_format == 'raster':
+        return input.estimate_compile_cost(source, limits)
+    try:
+        check_upload_size(source, limits)
+        with open_source(source) as source_file:
+            (glyph_size, glyph_count) = glyph_counters[input_format](source_file)
+    except ImageInputError:
+        raise
+    except Exception as exception:
+        raise ImageInputError(f'Unknown {input_format} font error') from exception
+    check_glyph_size(glyph_size)
+    check_glyph_pixels(glyph_size, glyph_count, limits)
+    return calculate_compile_cost(glyph_size, glyph_count)
+
+glyph_counters = {
+    'bdf': count_bdf_glyphs,
+    'pcf': count_pcf_glyphs,
+    'packed-binary': count_packed_binary_glyphs,
+    'packed-json': count_packed_json_glyphs,
+}
+
+def admit_source(source, limits=None):
+    if sniff_input_format(source) == 'raster':
+        input.admit_image(source, limits)
+    else:
+        check_upload_size(source, limits or default_image_limits)
@@ -1,40 +1,314 @@
-from flask import Flask, send_file, request
-from fontmake.font_project import FontProject
-from ufo2ft.fontInfoData import postscriptFontNameFallback
-from utils import temporary_cwd
-from input import open_bit_font
-from transforms import convert_to_font
+from flask import Flask, Response, send_file, request, abort, jsonify, url_for
+from io import BytesIO
+from admission import AdmissionController
+from compiler import compilers, compiler_version, default_compiler, compile_source_timed, create_archive, font_formats
+from cache import CompileCache, create_cache_key
+from executor import CompileExecutor, CompileQueueFullError, CompileTimeoutError
+from input import ImageInputError, ImageLimitError, ImageLimits, check_upload_bytes
+from jobs import JobStore, JobRunner
+from metrics import Histogram, Timings, format_server_timing, get_glyph_count_bucket
+from output import BitmapStrikes
+from readers import admit_source, estimate_compile_cost
+import math
+import os
+import tempfile
 
 app = Flask(__name__)
 
+compile_cache = CompileCache(
+    max_bytes=int(os.environ.get('BITFONTMAKE_CACHE_BYTES', 64 * 1024 * 1024)),
+    directory=os.environ.get('BITFONTMAKE_CACHE_DIR'))
+
+image_limits = ImageLimits(
+    max_upload_bytes=int(os.environ.get('BITFONTMAKE_MAX_UPLOAD_BYTES', 8 * 1024 * 1024)),
+    max_pixels=int(os.environ.get('BITFONTMAKE_MAX_PIXELS', 16 * 1024 * 1024)))
+
+compile_workers = int(os.environ.get('BITFONTMAKE_WORKERS', os.cpu_count()))
+
+compile_executor = CompileExecutor(
+    processes=compile_workers,
+    max_queued=int(os.environ.get('BITFONTMAKE_QUEUE', 8)),
+    timeout=float(os.environ.get('BITFONTMAKE_TIMEOUT', 540)),
+    warm_modules=['compiler'])
+
+admission_controller = AdmissionController(
+    budget=float(os.environ.get('BITFONTMAKE_COST_BUDGET', 250000 * max(compile_workers, 1))),
+    max_per_client=int(os.environ.get('BITFONTMAKE_CLIENT_REQUESTS', 2)),
+    cheap_cost=float(os.environ.get('BITFONTMAKE_CHEAP_COST', 10000)),
+    reserved_budget=float(os.environ.get('BITFONTMAKE_CHEAP_BUDGET', 50000)))
+
+trusted_proxies = int(os.environ.get('BITFONTMAKE_TRUSTED_PROXIES', 0))
+
+job_store = JobStore(
+    path=os.environ.get('BITFONTMAKE_JOBS_DB', os.path.join(tempfile.gettempdir(), 'bitfontmake-jobs.sqlite3')),
+    max_queued=int(os.environ.get('BITFONTMAKE_JOBS_QUEUE', 100)),
+    ttl=float(os.environ.get('BITFONTMAKE_JOBS_TTL', 3600)),
+    stale_after=compile_executor.timeout + 60)
+
+max_job_wait = float(os.environ.get('BITFONTMAKE_JOBS_MAX_WAIT', 30))
+
+stage_durations = Histogram(
+    'bitfontmake_stage_duration_seconds',
+    'Time spent in each stage of a compile request.',
+    ['stage', 'glyph_size', 'glyph_count'])
+
 @app.route('/compile-to-otf-alpha-support', methods=['POST'])
 def compile_font_to_otf():
-    return compile_font(
-        'otf',
-        lambda project: project.build_otfs)
+    return compile_font('otf')
 
 @app.route('/compile-to-ttf', methods=['POST'])
 def compile_font_to_ttf():
-    return compile_font(
-        'ttf',
-        lambda project: project.build_ttfs)
-
-def compile_font(extension, action):
-    with temporary_cwd():
-        bit_font = open_bit_font(request.stream)
-        font = convert_to_font(bit_font)
-        project = FontProject()
-        action(project)(
-            [font],
-            remove_overlaps=True)
-        font_filename = f'{get_font_name(font)}.{extension}'
-        return send_file(
-            open(f'master_{extension}/{font_filename}', 'rb'),
+    return compile_font('ttf')
+
+@app.route('/compile', methods=['POST'])
+def compile_font_to_archive():
+    formats = get_formats('ttf,otf,woff,woff2')
+    return send_compiled_font(
+        *get_compiled_font(formats, create_archive, 'zip'))
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    formats = get_formats('ttf')
+    compiler = get_compiler()
+    bitmap_strikes = get_bitmap_strikes(formats)
+    subset_text = get_subset_text()
+    data = get_upload_data()
+    admit_source(BytesIO(data), image_limits)
+    job = job_store.submit(data, {
+        'formats': formats,
+        'compiler': compiler,
+        'strikes': list(bitmap_strikes.scales),
+        'outlines': bitmap_strikes.outlines,
+        'text': subset_text,
+        'client': get_client(),
+    })
+    job_runner.notify()
+    return (
+        jsonify(describe_job(job)),
+        202,
+        {'Location': url_for('get_job', job_id=job.id)})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job_runner.start()
+    job = job_store.wait(job_id, get_job_wait())
+    if job is None:
+        abort(404, f'Unknown job {job_id}')
+    return jsonify(describe_job(job))
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        abort(404, f'Unknown job {job_id}')
+    elif job.status == 'failed':
+        return (job.error, job.error_status)
+    elif job.status != 'done':
+        return (f'Job {job_id} is {job.status}', 409, {'Retry-After': '1'})
+    compiled_font = job_store.get_result(job_id)
+    return send_file(
+        BytesIO(compiled_font.data),
+        as_attachment=True,
+        attachment_filename=compiled_font.filename)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(
+        stage_durations.render(),
+        mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(compile_cache.get_stats())
+
+@app.errorhandler(ImageLimitError)
+def handle_image_limit(error):
+    return (str(error), 413)
+
+@app.errorhandler(ImageInputError)
+def handle_image_input(error):
+    return (str(error), 400)
+
+@app.errorhandler(CompileQueueFullError)
+def handle_queue_full(error):
+    return (str(error), 503, {'Retry-After': '5'})
+
+@app.errorhandler(CompileTimeoutError)
+def handle_timeout(error):
+    return (str(error), 504)
+
+def compile_font(extension):
+    return send_compiled_font(
+        *get_compiled_font([extension], lambda compiled_fonts: compiled_fonts[0]))
+
+def get_formats(default_formats):
+    formats = request.args.get('formats', default_formats).split(',')
+    for font_format in formats:
+        if font_format not in font_formats:
+            abort(400, f'Unknown font format {font_format}')
+    return formats
+
+def get_compiler():
+    compiler = request.args.get('compiler', default_compiler)
+    if compiler not in compilers:
+        abort(400, f'Unknown compiler {compiler}')
+    return compiler
+
+def get_bitmap_strikes(formats):
+    try:
+        scales = tuple(sorted(set(
+            int(scale)
+            for scale in request.args.get('strikes', '').split(',')
+            if scale)))
+    except ValueError:
+        abort(400, f'Invalid strikes {request.args["strikes"]}')
+    if any(scale < 1 for scale in scales):
+        abort(400, f'Invalid strikes {request.args["strikes"]}')
+    outlines = request.args.get('outlines', '1') != '0'
+    if not outlines:
+        scales = scales or (1,)
+        if any(font_formats[font_format] != 'ttf' for font_format in formats):
+            abort(400, 'Bitmap-only fonts need a TrueType format (ttf, woff or woff2)')
+    return BitmapStrikes(scales=scales, outlines=outlines)
+
+def get_subset_text():
+    text = request.args.get('text')
+    codepoint_list = request.args.get('codepoints')
+    if text is None and codepoint_list is None:
+        return None
+    try:
+        listed_text = ''.join(
+            chr(int(codepoint[2:] if codepoint.upper().startswith('U+') else codepoint, 16))
+            for codepoint in (codepoint_list or '').split(',')
+            if codepoint)
+    except (ValueError, OverflowError):
+        abort(400, f'Invalid codepoints {codepoint_list}')
+    return ''.join(sorted(set((text or '') + listed_text)))
+
+def get_client():
+    forwarded = list(
+        address.strip()
+        for address in request.headers.get('X-Forwarded-For', '').split(',')
+        if address.strip())
+    route = forwarded + [request.remote_addr]
+    return route[max(len(route) - 1 - trusted_proxies, 0)]
+
+def get_job_wait():
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        abort(400, f'Invalid wait {request.args["wait"]}')
+    if math.isnan(wait):
+        abort(400, f'Invalid wait {request.args["wait"]}')
+    return min(max(wait, 0), max_job_wait)
+
+def get_upload_data():
+    if request.content_length:
+        check_upload_bytes(request.content_length, image_limits)
+    data = read_limited(request.stream, image_limits.max_upload_bytes + 1)
+    check_upload_bytes(len(data), image_limits)
+    return data
+
+def read_limited(stream, max_bytes):
+    chunks = []
+    remaining = max_bytes
+    while remaining:
+        chunk = stream.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+def get_compiled_font(formats, combine, *cache_options):
+    compiler = get_compiler()
+    bitmap_strikes = get_bitmap_strikes(formats)
+    subset_text = get_subset_text()
+    data = get_upload_data()
+    cache_key = create_compile_key(data, formats, compiler, bitmap_strikes, subset_text, *cache_options)
+    if request.if_none_match.contains(cache_key):
+        abort(Response(status=304, headers={'ETag': f'"{cache_key}"'}))
+    return (cache_key, *compile_cached(cache_key, get_client(), data, formats, compiler, bitmap_strikes, subset_text, combine))
+
+def create_compile_key(data, formats, compiler, bitmap_strikes, subset_text, *cache_options):
+    return create_cache_key(data, ','.join(formats), compiler, bitmap_strikes, repr(subset_text), compiler_version, *cache_options)
+
+def compile_cached(cache_key, client, data, formats, compiler, bitmap_strikes, subset_text, combine):
+    compiled_font = compile_cache.get(cache_key)
+    if compiled_font is None:
+        cost = estimate_compile_cost(BytesIO(data), image_limits)
+        with admission_controller.admit(client, cost):
+            result = compile_executor.run(compile_source_timed, data, formats, compiler, image_limits, bitmap_strikes, subset_text)
+        compiled_font = combine(result.compiled_fonts)
+        compile_cache.put(cache_key, compiled_font)
+        (glyph_width, glyph_height) = result.glyph_size
+        labels = (f'{glyph_width}x{glyph_height}', str(get_glyph_count_bucket(result.glyph_count)))
+        return (compiled_font, result.spans, labels)
+    else:
+        return (compiled_font, [], ('cached', 'cached'))
+
+def send_compiled_font(cache_key, compiled_font, spans, labels):
+    timings = Timings()
+    with timings.span('send_file'):
+        response = send_file(
+            BytesIO(compiled_font.data),
             as_attachment=True,
-            attachment_filename=font_filename)
+            attachment_filename=compiled_font.filename)
+        response.set_etag(cache_key)
+    spans = spans + timings.spans
+    for stage, seconds in spans:
+        stage_durations.observe(seconds, stage, *labels)
+    response.headers['Server-Timing'] = format_server_timing(spans)
+    return response
+
+def describe_job(job):
+    description = {
+        'id': job.id,
+        'status': job.status,
+        'formats': job.options['formats'],
+        'compiler': job.options['compiler'],
+        'created': job.created,
+        'updated': job.updated,
+    }
+    if job.status == 'done':
+        description['result'] = url_for('get_job_result', job_id=job.id)
+    elif job.status == 'failed':
+        description['error'] = job.error
+    return description
+
+def run_job(data, options):
+    formats = options['formats']
+    bitmap_strikes = BitmapStrikes(
+        scales=tuple(options.get('strikes', [])),
+        outlines=options.get('outlines', True))
+    subset_text = options.get('text')
+    client = options.get('client')
+    compile_options = (data, formats, options['compiler'], bitmap_strikes, subset_text)
+    if len(formats) == 1:
+        result = compile_cached(create_compile_key(*compile_options), client, *compile_options, lambda compiled_fonts: compiled_fonts[0])
+    else:
+        result = compile_cached(create_compile_key(*compile_options, 'zip'), client, *compile_options, create_archive)
+    (compiled_font, spans, labels) = result
+    for stage, seconds in spans:
+        stage_durations.observe(seconds, stage, *labels)
+    return compiled_font
+
+def get_job_error_status(error):
+    if isinstance(error, ImageLimitError):
+        return (413, str(error))
+    elif isinstance(error, ImageInputError):
+        return (400, str(error))
+    elif isinstance(error, CompileTimeoutError):
+        return (504, str(error))
+    else:
+        app.logger.error('Compile job failed', exc_info=error)
+        return (500, 'Compile job failed')
 
-def get_font_name(font):
-    return postscriptFontNameFallback(font.info)
+job_runner = JobRunner(
+    job_store,
+    run_job,
+    get_job_error_status,
+    threads=int(os.environ.get('BITFONTMAKE_JOBS_THREADS', 2)))
 
 if __name__ == '__main__':
     app.run(debug=True, use_reloader=True)
@@ -1,8 +1,19 @@
 from fontmake.font_project import FontProject
+from fontTools.pens.pointInsidePen import PointInsidePen
+from fontTools.ttLib import TTFont
+from io import BytesIO
 from objects import BitFont, BitInfo, BitGlyph
-from transforms import convert_to_font
+from compiler import compile_with_fontmake, compile_directly, compile_streaming, add_bitmap_strikes
+from create_test_image import create_test_image, save_image
+from incremental import GlyphStore
+from output import BitmapStrikes, head_timestamp
+from transforms import convert_to_font, subset_bit_font
 import codepoints
 from input import open_bit_font
+from input_packed import write_packed_binary_font, write_packed_json_font
+from readers import read_bit_font
+import numpy
+import struct
 
 def create_py_bit_font():
     o = False
@@ -62,7 +73,257 @@ def test_bit_font(bit_font):
     project = FontProject()
     project.build_ttfs(
         [font],
-        remove_overlaps=True)
+        remove_overlaps=False)
+
+def test_direct_compiler(bit_font):
+    for extension in ['ttf', 'otf']:
+        fontmake_font = load_compiled_font(compile_with_fontmake(bit_font, [extension])[0])
+        direct_font = load_compiled_font(compile_directly(bit_font, [extension])[0])
+        assert_fonts_equivalent(bit_font.size, fontmake_font, direct_font)
+
+def test_streaming_compiler(bit_font):
+    for extension in ['ttf', 'otf']:
+        direct_font = compile_directly(bit_font, [extension])[0]
+        streaming_font = compile_streaming(bit_font, [extension])[0]
+        assert streaming_font == direct_font
+
+def test_timestamps(bit_font):
+    for compile_function in [compile_with_fontmake, compile_directly]:
+        for compiled_font in compile_function(bit_font, ['ttf', 'otf']):
+            font = load_compiled_font(compiled_font)
+            assert font['head'].created == head_timestamp
+            assert font['head'].modified == head_timestamp
+
+def test_incremental_compiler(bit_font):
+    changed_bit_font = bit_font._replace(glyphs=[
+        BitGlyph(
+            codepoint=bit_glyph.codepoint,
+            bits=list(not bit for bit in bit_glyph.bits) if i == 0 else bit_glyph.bits)
+        for i, bit_glyph in enumerate(bit_font.glyphs)])
+    glyph_store = GlyphStore(bit_font.size)
+    for extension, table_tag in [('ttf', 'glyf'), ('otf', 'CFF ')]:
+        compile_directly(bit_font, [extension], glyph_store=glyph_store)
+        for compiled_bit_font in [bit_font, changed_bit_font]:
+            incremental_font = load_compiled_font(compile_directly(compiled_bit_font, [extension], glyph_store=glyph_store)[0])
+            direct_font = load_compiled_font(compile_directly(compiled_bit_font, [extension])[0])
+            for tag in [table_tag, 'hmtx']:
+                assert incremental_font.reader[tag] == direct_font.reader[tag]
+
+def test_bitmap_strikes(bit_font):
+    (width, height) = bit_font.size
+    scales = (1, 3)
+    for compile_function in [compile_with_fontmake, compile_directly]:
+        for outlines in [True, False]:
+            compiled_font = compile_function(bit_font, ['ttf'])[0]
+            font = load_compiled_font(add_bitmap_strikes(compiled_font, bit_font, BitmapStrikes(scales, outlines)))
+            cmap = font.getBestCmap()
+            for strike, strike_data, scale in zip(font['EBLC'].strikes, font['EBDT'].strikeData, scales):
+                metrics = strike.indexSubTables[0].metrics
+                for bit_glyph in bit_font.glyphs:
+                    bitmap = strike_data[cmap.get(ord(bit_glyph.codepoint), '.notdef')]
+                    rows = list(
+                        bitmap.getRow(y, bitDepth=1, metrics=metrics, reverseBytes=True)
+                        for y in range(0, height * scale))
+                    assert list(
+                        bool(rows[y * scale][x * scale // 8] >> (x * scale % 8) & 1)
+                        for y in range(0, height)
+                        for x in range(0, width)) == list(bit_glyph.bits)
+
+def test_subset(bit_font):
+    subset_text = bit_font.glyphs[0].codepoint.lower()
+    subset_font = load_compiled_font(compile_directly(subset_bit_font(bit_font, subset_text), ['ttf'])[0])
+    full_font = load_compiled_font(compile_directly(bit_font, ['ttf'])[0])
+    subset_cmap = subset_font.getBestCmap()
+    assert ord(subset_text) in subset_cmap
+    assert ord(subset_text.upper()) not in subset_cmap
+    assert subset_font['OS/2'].sxHeight == full_font['OS/2'].sxHeight
+    assert set(subset_cmap.keys()) <= set(full_font.getBestCmap().keys())
+    assert set(map(ord, codepoints.spaces)) <= set(subset_cmap.keys())
+    assert subset_font['glyf']['.notdef'] == full_font['glyf']['.notdef']
+    uppercase_text = bit_font.glyphs[0].codepoint.upper()
+    for compile_function in [compile_with_fontmake, compile_directly, compile_streaming]:
+        uppercase_font = load_compiled_font(compile_function(subset_bit_font(bit_font, uppercase_text), ['ttf'])[0])
+        uppercase_cmap = uppercase_font.getBestCmap()
+        assert ord(uppercase_text) in uppercase_cmap
+        assert ord(uppercase_text.lower()) not in uppercase_cmap
+
+def test_packed_rows_and_columns(bit_font):
+    (width, height) = bit_font.size
+    for bit_glyph in bit_font.glyphs:
+        bits = list(bit_glyph.bits)
+        for y in range(0, height):
+            assert list(bit_glyph.bits.get_row(y, width)) == bits[y * width : (y + 1) * width]
+        for x in range(0, width):
+            assert list(bit_glyph.bits.get_column(x, width)) == bits[x : width * height : width]
+
+def test_packed_input(bit_font):
+    for write_packed_font in [write_packed_json_font, write_packed_binary_font]:
+        packed_font = read_bit_font(BytesIO(write_packed_font(bit_font)))
+        assert packed_font.size == bit_font.size
+        assert packed_font.info == bit_font.info
+        assert packed_font.glyphs == bit_font.glyphs
+
+def test_pcf_input(bit_font):
+    for byte_and_bit_order in [0x0, 0x4, 0x8, 0xC]:
+        for glyph_pad in range(0, 4):
+            for scan_unit in range(0, 3):
+                for compressed_metrics in [0, 0x100]:
+                    table_format = byte_and_bit_order | glyph_pad | scan_unit << 4 | compressed_metrics
+                    pcf_font = read_bit_font(BytesIO(create_pcf_font(bit_font, table_format)))
+                    assert pcf_font.size == bit_font.size
+                    assert dict(pcf_font.glyphs) == dict(bit_font.glyphs)
+
+def create_pcf_font(bit_font, table_format):
+    (width, height) = bit_font.size
+    glyphs = bit_font.glyphs
+    order = '>' if table_format & 0x4 else '<'
+    row_bytes = (width + 7) // 8
+    row_bytes += -row_bytes % (1 << (table_format & 3))
+    scan_unit = 1 << (table_format >> 4 & 3)
+    pixels = numpy.zeros((len(glyphs), height, row_bytes * 8), bool)
+    pixels[:, :, 0 : width] = list(numpy.reshape(list(glyph.bits), (height, width)) for glyph in glyphs)
+    bitmaps = numpy.packbits(pixels, axis=2, bitorder='big' if table_format & 0x8 else 'little').reshape(-1)
+    bitmaps = numpy.pad(bitmaps, (0, -len(bitmaps) % scan_unit))
+    if bool(table_format & 0x4) != bool(table_format & 0x8):
+        bitmaps = bitmaps.reshape(-1, scan_unit)[:, ::-1].reshape(-1)
+    glyph_codes = list(ord(glyph.codepoint) for glyph in glyphs)
+    (first_row, last_row) = (min(glyph_codes) >> 8, max(glyph_codes) >> 8)
+    indices = [0xFFFF] * ((last_row - first_row + 1) * 256)
+    for i, glyph_code in enumerate(glyph_codes):
+        indices[((glyph_code >> 8) - first_row) * 256 + (glyph_code & 0xFF)] = i
+    if table_format & 0x100:
+        metrics = struct.pack(f'{order}h', len(glyphs)) + bytes([0x80, 0x80 + width, 0x80 + width, 0x80 + height, 0x80]) * len(glyphs)
+    else:
+        metrics = struct.pack(f'{order}i', len(glyphs)) + struct.pack(f'{order}5hH', 0, width, width, height, 0, 0) * len(glyphs)
+    tables = [
+        (1 << 0, table_format & 0xC, struct.pack(f'{order}ii', 0, 0)),
+        (1 << 2, table_format & 0x10C, metrics),
+        (1 << 3, table_format & 0x3F, struct.pack(
+            f'{order}i{len(glyphs)}i4i',
+            len(glyphs),
+            *(i * row_bytes * height for i in range(0, len(glyphs))),
+            *[len(bitmaps)] * 4) + bitmaps.tobytes()),
+        (1 << 5, table_format & 0xC, struct.pack(f'{order}5h{len(indices)}H', 0, 255, first_row, last_row, 0, *indices)),
+    ]
+    header = b'\x01fcp' + struct.pack('<I', len(tables))
+    table_of_contents = b''
+    table_data = b''
+    for table_type, data_format, data in tables:
+        data = struct.pack('<I', data_format) + data
+        data += bytes(-len(data) % 4)
+        table_of_contents += struct.pack('<IIII', table_type, data_format, len(data), len(header) + 16 * len(tables) + len(table_data))
+        table_data += data
+    return header + table_of_contents + table_data
+
+def test_bdf_input():
+    bdf_font = read_bit_font(BytesIO(b'''STARTFONT 2.1
+COMMENT Inline test font
+FONT -Misc-Inline-Bold-R-Normal--4-40-75-75-C-50-ISO10646-1
+SIZE 4 75 75
+FONTBOUNDINGBOX 5 4 0 -1
+STARTPROPERTIES 2
+FAMILY_NAME "Inline"
+WEIGHT_NAME "Bold"
+ENDPROPERTIES
+CHARS 2
+STARTCHAR A
+ENCODING 65
+SWIDTH 1000 0
+DWIDTH 5 0
+BBX 5 3 0 0
+BITMAP
+70
+88
+F8
+ENDCHAR
+STARTCHAR j
+ENCODING 106
+SWIDTH 1000 0
+DWIDTH 5 0
+BBX 2 2 1 -1
+BITMAP
+40
+80
+ENDCHAR
+ENDFONT
+'''))
+    o = False
+    X = True
+    assert bdf_font.size == (5, 4)
+    assert bdf_font.info.family_name == 'Inline'
+    assert bdf_font.info.weight == 700
+    assert bdf_font.glyphs[0:2] == [
+        BitGlyph(
+            codepoint='A',
+            bits=[
+                o, X, X, X, o,
+                X, o, o, o, X,
+                X, X, X, X, X,
+                o, o, o, o, o,
+            ]),
+        BitGlyph(
+            codepoint='j',
+            bits=[
+                o, o, o, o, o,
+                o, o, o, o, o,
+                o, o, X, o, o,
+                o, X, o, o, o,
+            ]),
+    ]
+    assert bdf_font.glyphs[2].codepoint == codepoints.replacement_character
+
+def test_grid_layout():
+    def open_test_image(glyph_columns):
+        image_file = BytesIO()
+        save_image(
+            create_test_image(
+                family_name='Bit Font Make TestGrid',
+                glyph_size=(4, 6),
+                glyph_codepoints='ABCDEFG',
+                density=0.5,
+                glyph_columns=glyph_columns),
+            image_file,
+            'png')
+        return open_bit_font(BytesIO(image_file.getvalue()))
+    bit_font = open_test_image(1)
+    for glyph_columns in [2, 3, 7, 8]:
+        assert open_test_image(glyph_columns) == bit_font
+
+def load_compiled_font(compiled_font):
+    return TTFont(BytesIO(compiled_font.data))
+
+def assert_fonts_equivalent(bit_size, expected, actual):
+    assert expected['head'].unitsPerEm == actual['head'].unitsPerEm
+    assert expected['hhea'].ascent == actual['hhea'].ascent
+    assert expected['hhea'].descent == actual['hhea'].descent
+    assert expected['OS/2'].usWeightClass == actual['OS/2'].usWeightClass
+    assert expected['OS/2'].fsType == actual['OS/2'].fsType
+    for name_id in [0, 1, 2, 4, 6, 9, 12, 13, 14]:
+        assert expected['name'].getDebugName(name_id) == actual['name'].getDebugName(name_id)
+    expected_cmap = expected.getBestCmap()
+    actual_cmap = actual.getBestCmap()
+    assert expected_cmap.keys() == actual_cmap.keys()
+    glyph_names = ['.notdef'] + list(expected_cmap.values())
+    assert set(glyph_names) == set(actual.getGlyphOrder())
+    for glyph_name in glyph_names:
+        assert expected['hmtx'][glyph_name] == actual['hmtx'][glyph_name]
+        assert (get_glyph_coverage(bit_size, expected, glyph_name)
+            == get_glyph_coverage(bit_size, actual, glyph_name))
+
+def get_glyph_coverage(bit_size, font, glyph_name):
+    (width, height) = bit_size
+    units_per_pixel = font['head'].unitsPerEm // height
+    glyph_set = font.getGlyphSet()
+    def is_covered(x, y):
+        pen = PointInsidePen(glyph_set, (
+            (x + 0.5) * units_per_pixel,
+            (y + 0.5) * units_per_pixel))
+        glyph_set[glyph_name].draw(pen)
+        return pen.getResult()
+    return list(
+        is_covered(x, y)
+        for y in range(0, height)
+        for x in range(0, width))
 
 bit_fonts = [
     create_py_bit_font(),
@@ -71,3 +332,14 @@ bit_fonts = [
 ]
 for bit_font in bit_fonts:
     test_bit_font(bit_font)
+    test_direct_compiler(bit_font)
+    test_streaming_compiler(bit_font)
+    test_timestamps(bit_font)
+    test_incremental_compiler(bit_font)
+    test_bitmap_strikes(bit_font)
+    test_subset(bit_font)
+    test_packed_rows_and_columns(bit_font)
+    test_packed_input(bit_font)
+    test_pcf_input(bit_font)
+test_bdf_input()
+test_grid_layout()
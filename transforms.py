@@ -1,23 +1,42 @@
-from defcon import Font, Glyph, Contour, Point
+from defcon import Font, Glyph, Contour, Point, Component
 from functools import partial
-from objects import BitFont, BitInfo, BitGlyph, BitMetrics
+from objects import BitGlyph, BitMetrics, PackedBits
+from outlines import trace_outlines
 import codepoints
 import re
 import unicodedata
-from utils import flatten, distinct, distinct_by, count_while
+from utils import flatten, distinct, distinct_by
 
 def convert_to_font(bit_font):
-    bit_metrics = calculate_bit_metrics(bit_font.size, bit_font.glyphs)
-    all_bit_glyphs = add_extra_bit_glyphs(bit_font.glyphs, bit_metrics)
+    bit_metrics = calculate_bit_metrics(bit_font)
+    all_bit_glyphs = add_extra_bit_glyphs(bit_font, bit_metrics)
     return create_font(
         info_params=convert_to_info_params(bit_metrics, bit_font.info),
         glyphs=convert_to_glyphs(bit_metrics, all_bit_glyphs))
 
-def calculate_bit_metrics(bit_size, bit_glyphs):
-    (width, height) = bit_size
+def subset_bit_font(bit_font, text):
+    kept_codepoints = (set(text)
+        | set(codepoints.spaces)
+        | {codepoints.replacement_character})
+    all_bit_glyphs = list(distinct_by(
+        lambda bit_glyph: bit_glyph.codepoint,
+        bit_font.glyphs + list(create_lowercase_bit_glyphs(bit_font.glyphs))))
+    return bit_font._replace(
+        glyphs=keep_codepoints(all_bit_glyphs, kept_codepoints),
+        x_height=get_x_height(bit_font),
+        kept_codepoints=frozenset(kept_codepoints))
+
+def keep_codepoints(bit_glyphs, kept_codepoints):
+    return list(
+        bit_glyph
+        for bit_glyph in bit_glyphs
+        if bit_glyph.codepoint in kept_codepoints)
+
+def calculate_bit_metrics(bit_font):
+    (width, height) = bit_font.size
     units_per_pixel = 100
     units_per_em = units_per_pixel * height
-    x_height = units_per_pixel * (find_x_height(bit_size, bit_glyphs))
+    x_height = units_per_pixel * get_x_height(bit_font)
     stems = list(
         units_per_pixel * (i + 1)
         for i in range(0, 4))
@@ -43,16 +62,20 @@ def calculate_bit_metrics(bit_size, bit_glyphs):
         values=values,
         scale=scale)
 
-def add_extra_bit_glyphs(bit_glyphs, bit_metrics):
-    return list(distinct_by(
+def add_extra_bit_glyphs(bit_font, bit_metrics):
+    all_bit_glyphs = list(distinct_by(
         lambda bit_glyph: bit_glyph.codepoint,
-        bit_glyphs
+        bit_font.glyphs
         + list(create_space_bit_glyphs(bit_metrics))
-        + list(create_lowercase_bit_glyphs(bit_glyphs))))
+        + list(create_lowercase_bit_glyphs(bit_font.glyphs))))
+    if bit_font.kept_codepoints is None:
+        return all_bit_glyphs
+    else:
+        return keep_codepoints(all_bit_glyphs, bit_font.kept_codepoints)
 
 def create_space_bit_glyphs(bit_metrics):
-    space_bits = ([False]
-        * bit_metrics.width
+    space_bits = PackedBits.blank(
+        bit_metrics.width
         * bit_metrics.height)
     return (BitGlyph(codepoint=codepoint, bits=space_bits)
         for codepoint in codepoints.spaces)
@@ -92,11 +115,21 @@ def convert_to_info_params(bit_metrics, bit_info):
         ('openTypeNameDesigner', bit_info.designer),
         ('openTypeNameDesignerURL', bit_info.designer_url),
         ('copyright', f'Copyright {bit_info.copyright_year} {bit_info.designer}'),
-        ('openTypeNameLicense', 'This Font Software is licensed under the SIL Open Font License, Version 1.1. This license is available with a FAQ at: http://scripts.sil.org/OFL. This Font Software is distributed on an \u2018AS IS\u2019 BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the SIL Open Font License for the specific language, permissions and limitations governing your use of this Font Software.' if bit_info.is_ofl else None),
-        ('openTypeNameLicenseURL', 'http://scripts.sil.org/OFL' if bit_info.is_ofl else None),
+        ('openTypeNameLicense', ofl_license if bit_info.is_ofl else None),
+        ('openTypeNameLicenseURL', ofl_license_url if bit_info.is_ofl else None),
         ('openTypeOS2Type', [] if bit_info.is_ofl else None),
     ]
 
+ofl_license = 'This Font Software is licensed under the SIL Open Font License, Version 1.1. This license is available with a FAQ at: http://scripts.sil.org/OFL. This Font Software is distributed on an \u2018AS IS\u2019 BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the SIL Open Font License for the specific language, permissions and limitations governing your use of this Font Software.'
+
+ofl_license_url = 'http://scripts.sil.org/OFL'
+
+def get_x_height(bit_font):
+    if bit_font.x_height is None:
+        return find_x_height(bit_font.size, bit_font.glyphs)
+    else:
+        return bit_font.x_height
+
 def find_x_height(bit_size, bit_glyphs):
     (width, height) = bit_size
     x_glyph_option = list(glyph
@@ -104,39 +137,59 @@ def find_x_height(bit_size, bit_glyphs):
         if glyph.codepoint == 'x')
     if x_glyph_option:
         x_glyph = x_glyph_option[0]
-        blank_bits = count_while(
-            lambda value: not value,
-            x_glyph.bits)
+        blank_bits = x_glyph.bits.count_leading_blanks()
         blank_rows = blank_bits / height
         return height - blank_rows
     else:
         return height
 
 def convert_to_glyphs(bit_metrics, bit_glyphs):
+    bit_glyphs = list(bit_glyphs)
+    base_glyph_names = find_base_glyph_names(bit_glyphs)
     return map(
-        partial(convert_to_glyph, bit_metrics),
+        partial(convert_to_glyph, bit_metrics, base_glyph_names),
         bit_glyphs)
 
-def convert_to_glyph(bit_metrics, bit_glyph):
-    return create_glyph(
-        codepoint=bit_glyph.codepoint,
-        width=bit_metrics.total_advance,
-        contours=convert_to_contours(bit_metrics, bit_glyph.bits))
+def find_base_glyph_names(bit_glyphs):
+    first_glyph_names = {}
+    base_glyph_names = {}
+    for bit_glyph in bit_glyphs:
+        if can_share_outline(bit_glyph):
+            glyph_name = get_glyph_name(bit_glyph.codepoint)
+            first_glyph_name = first_glyph_names.setdefault(
+                bit_glyph.bits,
+                glyph_name)
+            if first_glyph_name != glyph_name:
+                base_glyph_names[bit_glyph.codepoint] = first_glyph_name
+    return base_glyph_names
+
+def can_share_outline(bit_glyph):
+    return (bit_glyph.codepoint != codepoints.replacement_character
+        and not bit_glyph.bits.is_blank())
+
+def convert_to_glyph(bit_metrics, base_glyph_names, bit_glyph):
+    base_glyph_name = base_glyph_names.get(bit_glyph.codepoint)
+    if base_glyph_name:
+        return create_glyph(
+            codepoint=bit_glyph.codepoint,
+            width=bit_metrics.total_advance,
+            contours=[],
+            components=[create_component(base_glyph_name)])
+    else:
+        return create_glyph(
+            codepoint=bit_glyph.codepoint,
+            width=bit_metrics.total_advance,
+            contours=convert_to_contours(bit_metrics, bit_glyph.bits))
 
 def convert_to_contours(bit_metrics, bits):
-    for y in range(0, bit_metrics.height):
-        for x in range(0, bit_metrics.width):
-            if bits[y * bit_metrics.width + x]:
-                points = [
-                    (x + 0, y + 0),
-                    (x + 1, y + 0),
-                    (x + 1, y + 1),
-                    (x + 0, y + 1),
-                ]
-                yield create_contour(
-                    map(
-                        partial(transform_pixels_to_units, bit_metrics),
-                        points))
+    outlines = trace_outlines(
+        (bit_metrics.width, bit_metrics.height),
+        bits)
+    for points in outlines:
+        yield create_contour(
+            map(
+                partial(transform_pixels_to_units, bit_metrics),
+                points))
 
 def transform_pixels_to_units(bit_metrics, point):
     offset_x = bit_metrics.left_advance
@@ -154,13 +207,20 @@ def create_contour(contour_path):
         contour.appendPoint(point)
     return contour
 
-def create_glyph(codepoint, width, contours):
+def create_component(base_glyph_name):
+    component = Component()
+    component.baseGlyph = base_glyph_name
+    return component
+
+def create_glyph(codepoint, width, contours, components=[]):
     glyph = Glyph()
     glyph.name = get_glyph_name(codepoint)
     glyph.unicode = ord(codepoint)
     glyph.width = width
     for contour in contours:
         glyph.appendContour(contour)
+    for component in components:
+        glyph.appendComponent(component)
     return glyph
 
 english_alphabet = re.compile('^[A-Za-z]$')
@@ -1,25 +1,9 @@
-from contextlib import contextmanager
-from itertools import takewhile, chain
-from tempfile import TemporaryDirectory
-import os
+from itertools import chain
+import numpy
 
-@contextmanager
-def change_cwd(path):
-    original_cwd = os.getcwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(original_cwd)
-
-@contextmanager
-def temporary_cwd():
-    with TemporaryDirectory() as path:
-        with change_cwd(path):
-            yield
-
-def count_while(test, iterable):
-    return len(list(takewhile(test, iterable)))
+def count_leading(mask):
+    stops = numpy.flatnonzero(~mask)
+    return int(stops[0]) if stops.size else mask.size
 
 def flatten(list_of_lists):
     return list(chain.from_iterable(list_of_lists))